@@ -0,0 +1,38 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that reuses validated tokens for a few seconds."""
+    # Seconds to skip re-verification; entries never outlive the token's exp
+    cache_ttl = 5
+    cache_max_size = 1024
+
+    _token_cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def get_validated_token(self, raw_token):
+        key = hashlib.blake2b(raw_token, digest_size=16).digest()
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._token_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        validated_token = super().get_validated_token(raw_token)
+        ttl = min(self.cache_ttl, validated_token['exp'] - time.time())
+        if ttl > 0:
+            with self._lock:
+                self._token_cache[key] = (now + ttl, validated_token)
+                self._token_cache.move_to_end(key)
+                while len(self._token_cache) > self.cache_max_size:
+                    self._token_cache.popitem(last=False)
+        return validated_token
+
+
+class CachedJWTStatelessAuthentication(CachedJWTAuthentication, JWTStatelessUserAuthentication):
+    """Cached JWT authentication that builds the user from token claims, without a DB lookup."""
@@ -0,0 +1,8 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id hasher with lower per-login cost than Django's defaults."""
+    time_cost = 2
+    memory_cost = 65536
+    parallelism = 2
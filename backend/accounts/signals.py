@@ -0,0 +1,16 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+
+
+def profile_cache_key(user_id) -> str:
+    """Cache key of the profile served by /me."""
+    return f'accounts:profile:{user_id}'
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    """Drop the cached profile so /me serves the updated one."""
+    cache.delete(profile_cache_key(instance.pk))
@@ -1,7 +1,14 @@
 from django.test import TestCase
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import patch
+from .authentication import CachedJWTAuthentication
+from .serializers import UserSerializer
 
 User = get_user_model()
 
@@ -25,6 +32,20 @@ class UserModelTest(TestCase):
         self.assertFalse(user.is_staff)
         self.assertFalse(user.is_superuser)
 
+    def test_password_hashed_with_argon2(self):
+        """Test new passwords are hashed with Argon2."""
+        user = User.objects.create_user(**self.user_data)
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    def test_pbkdf2_password_upgraded(self):
+        """Test legacy PBKDF2 hashes are upgraded on successful check."""
+        user = User.objects.create_user(**self.user_data)
+        user.password = make_password(self.user_data['password'], hasher='pbkdf2_sha256')
+        user.save()
+        self.assertTrue(user.check_password(self.user_data['password']))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
     def test_user_str(self):
         """Test user string representation."""
         user = User.objects.create_user(**self.user_data)
@@ -35,6 +56,7 @@ class AuthAPITest(TestCase):
     """Tests for authentication API."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.register_url = '/api/auth/register/'
         self.login_url = '/api/auth/login/'
@@ -52,6 +74,19 @@ class AuthAPITest(TestCase):
         self.assertIn('access', response.data)
         self.assertIn('refresh', response.data)
         self.assertIn('user', response.data)
+        user = User.objects.get(email=data['email'])
+        self.assertEqual(response.data['user'], UserSerializer(user).data)
+
+    def test_register_preflight(self):
+        """Test CORS preflight is answered by the CORS middleware."""
+        response = self.client.options(
+            self.register_url,
+            HTTP_ORIGIN='http://localhost:3000',
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access-control-allow-origin', response.headers)
+        self.assertIn('POST', response.headers['access-control-allow-methods'])
 
     def test_register_password_mismatch(self):
         """Test registration with mismatched passwords."""
@@ -89,3 +124,116 @@ class AuthAPITest(TestCase):
         response = self.client.post(self.login_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_login_throttled(self):
+        """Test repeated login attempts from one client are throttled."""
+        data = {
+            'email': 'test@example.com',
+            'password': 'wrongpass',
+        }
+        for _ in range(5):
+            response = self.client.post(self.login_url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(self.login_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_inactive_user(self):
+        """Test inactive users cannot log in."""
+        User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123',
+            is_active=False
+        )
+        data = {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        }
+        response = self.client.post(self.login_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    """Tests for cached JWT authentication."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        cache.clear()
+        self.raw_token = str(RefreshToken.for_user(self.user).access_token).encode()
+        self.authentication = CachedJWTAuthentication()
+
+    def test_validated_token_reused(self):
+        """Test a token validated once is served from the cache."""
+        first = self.authentication.get_validated_token(self.raw_token)
+        with patch.object(JWTAuthentication, 'get_validated_token') as mock_validate:
+            second = self.authentication.get_validated_token(self.raw_token)
+        mock_validate.assert_not_called()
+        self.assertIs(first, second)
+
+    def test_authenticated_request(self):
+        """Test API requests authenticate with a bearer token."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.raw_token.decode()}')
+        response = client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_me_served_from_cache(self):
+        """Test /me/ answers from the profile cached at login without a DB query."""
+        response = APIClient().post(
+            '/api/auth/login/',
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            format='json'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        with self.assertNumQueries(0):
+            me_response = client.get('/api/auth/me/')
+        self.assertEqual(me_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(me_response.data, response.data['user'])
+        self.assertNotIn('user', RefreshToken(response.data['refresh']).payload)
+
+    def test_me_after_profile_update(self):
+        """Test /me/ serves the updated profile without logging in again."""
+        response = APIClient().post(
+            '/api/auth/login/',
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            format='json'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        update_response = client.patch(
+            '/api/auth/profile/', {'first_name': 'Ivan', 'phone': '+79990000000'}, format='json'
+        )
+        self.assertEqual(update_response.status_code, status.HTTP_200_OK)
+
+        me_response = client.get('/api/auth/me/')
+        self.assertEqual(me_response.data['first_name'], 'Ivan')
+        self.assertEqual(me_response.data['phone'], '+79990000000')
+
+    def test_me_deleted_user(self):
+        """Test /me/ rejects a still-valid token of a deleted user."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.raw_token.decode()}')
+        self.user.delete()
+        response = client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_me_deactivated_user(self):
+        """Test /me/ stops serving the profile once the user is deactivated."""
+        response = APIClient().post(
+            '/api/auth/login/',
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            format='json'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(client.get('/api/auth/me/').status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        response = client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,10 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Per-IP limit on login attempts, so the password hasher can't be used to pin workers."""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        # Keyed by client IP even when a bearer token is sent along
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
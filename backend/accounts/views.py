@@ -1,106 +1,99 @@
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.utils import timezone
 import logging
-from .serializers import UserRegistrationSerializer, UserSerializer, UserDetailSerializer
+from .serializers import UserRegistrationSerializer, UserDetailSerializer
 from .models import User
+from .authentication import CachedJWTStatelessAuthentication
+from .signals import profile_cache_key
+from .throttles import LoginRateThrottle
 
 logger = logging.getLogger(__name__)
 
-
-@api_view(['POST', 'OPTIONS'])
+# Profiles served by `me`; saving a user drops its entry
+PROFILE_CACHE_TIMEOUT = 600
+
+
+def _user_payload(user):
+    """Same fields as UserSerializer, without serializer overhead on the auth path."""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'phone': user.phone,
+        'avatar': user.avatar.url if user.avatar else None,
+        'bio': user.bio,
+        'created_at': timezone.localtime(user.created_at).isoformat(),
+    }
+
+
+def _auth_payload(user):
+    """User data plus a freshly signed refresh/access token pair."""
+    user_data = _user_payload(user)
+    # Warm the profile cache so the client's first /me skips the database
+    cache.set(profile_cache_key(user.id), user_data, PROFILE_CACHE_TIMEOUT)
+    refresh = RefreshToken.for_user(user)
+    return {
+        'user': user_data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def _check_credentials(email, password):
+    """ModelBackend's check in one lookup, without iterating auth backends."""
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        User().set_password(password)
+        return None
+    if user.check_password(password) and user.is_active:
+        return user
+    return None
+
+
+@api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def register(request):
     """User registration endpoint."""
-    if request.method == 'OPTIONS':
-        # Handle CORS preflight
-        response = Response()
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        return response
-    
-    try:
-        logger.info(f"Registration request received. Method: {request.method}, Data: {request.data}")
-        serializer = UserRegistrationSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            refresh = RefreshToken.for_user(user)
-            response_data = {
-                'user': UserSerializer(user).data,
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
-            response = Response(response_data, status=status.HTTP_201_CREATED)
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        logger.warning(f"Serializer validation failed: {serializer.errors}")
-        error_response = Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        error_response['Access-Control-Allow-Origin'] = '*'
-        return error_response
-    except Exception as e:
-        logger.error(f"Registration error: {str(e)}", exc_info=True)
-        error_response = Response(
-            {'error': f'Ошибка регистрации: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-        error_response['Access-Control-Allow-Origin'] = '*'
-        return error_response
+    logger.info("Registration request received")
+    serializer = UserRegistrationSerializer(data=request.data)
+    if serializer.is_valid():
+        user = serializer.save()
+        return Response(_auth_payload(user), status=status.HTTP_201_CREATED)
+    logger.warning("Serializer validation failed: %s", serializer.errors)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST', 'OPTIONS'])
+@api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login(request):
     """User login endpoint."""
-    if request.method == 'OPTIONS':
-        # Handle CORS preflight
-        response = Response()
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        return response
-    
-    try:
-        logger.info(f"Login request received. Method: {request.method}, Data: {request.data}")
-        email = request.data.get('email')
-        password = request.data.get('password')
-
-        if email is None or password is None:
-            error_response = Response(
-                {'error': 'Необходимо указать email и пароль'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            error_response['Access-Control-Allow-Origin'] = '*'
-            return error_response
-
-        user = authenticate(username=email, password=password)
-        if user is None:
-            error_response = Response(
-                {'error': 'Неверные учетные данные'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            error_response['Access-Control-Allow-Origin'] = '*'
-            return error_response
-
-        refresh = RefreshToken.for_user(user)
-        response_data = {
-            'user': UserSerializer(user).data,
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
-        response = Response(response_data, status=status.HTTP_200_OK)
-        response['Access-Control-Allow-Origin'] = '*'
-        return response
-    except Exception as e:
-        logger.error(f"Login error: {str(e)}", exc_info=True)
-        error_response = Response(
-            {'error': f'Ошибка входа: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    email = request.data.get('email')
+    password = request.data.get('password')
+    logger.info("Login request received for %s", email)
+
+    if email is None or password is None:
+        return Response(
+            {'error': 'Необходимо указать email и пароль'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        error_response['Access-Control-Allow-Origin'] = '*'
-        return error_response
+
+    user = _check_credentials(email, password)
+    if user is None:
+        return Response(
+            {'error': 'Неверные учетные данные'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    return Response(_auth_payload(user), status=status.HTTP_200_OK)
 
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -113,11 +106,21 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 
 @api_view(['GET'])
+@authentication_classes([CachedJWTStatelessAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def me(request):
-    """Get current user profile."""
-    serializer = UserSerializer(request.user)
-    return Response(serializer.data)
+    """Get current user profile, cached until the user is saved."""
+    cache_key = profile_cache_key(request.user.id)
+    user_data = cache.get(cache_key)
+    if user_data is None:
+        # Stateless auth never loads the user, so deleted or deactivated
+        # accounts are only noticed here
+        user = User.objects.filter(pk=request.user.id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Пользователь не найден или неактивен')
+        user_data = _user_payload(user)
+        cache.set(cache_key, user_data, PROFILE_CACHE_TIMEOUT)
+    return Response(user_data)
 
 
 @api_view(['GET', 'POST'])
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+CREATE_CATEGORY_STATS_MV = """
+CREATE MATERIALIZED VIEW category_stats_mv AS
+SELECT
+    c.id,
+    c.name,
+    COUNT(DISTINCT ra.route_id) AS route_count,
+    COUNT(DISTINCT CASE WHEN a.is_active THEN a.id END) AS attraction_count,
+    COUNT(ra.id) AS total_mentions
+FROM attractions_category c
+LEFT JOIN attractions_attraction a ON a.category_id = c.id
+LEFT JOIN routes_routeattraction ra ON ra.attraction_id = a.id
+GROUP BY c.id, c.name;
+
+CREATE UNIQUE INDEX category_stats_mv_id_idx ON category_stats_mv (id);
+CREATE INDEX category_stats_mv_route_count_idx ON category_stats_mv (route_count DESC);
+"""
+
+DROP_CATEGORY_STATS_MV = "DROP MATERIALIZED VIEW IF EXISTS category_stats_mv;"
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('attractions', '0001_initial'),
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_CATEGORY_STATS_MV, DROP_CATEGORY_STATS_MV),
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('route_count', models.IntegerField(verbose_name='Количество маршрутов')),
+                ('attraction_count', models.IntegerField(verbose_name='Количество достопримечательностей')),
+                ('total_mentions', models.IntegerField(verbose_name='Упоминания в маршрутах')),
+            ],
+            options={
+                'verbose_name': 'Статистика категории',
+                'verbose_name_plural': 'Статистика категорий',
+                'db_table': 'category_stats_mv',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import connection, models
+
+
+class CategoryStats(models.Model):
+    """Pre-aggregated category usage backed by the category_stats_mv materialized view."""
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=100, verbose_name='Название')
+    route_count = models.IntegerField(verbose_name='Количество маршрутов')
+    attraction_count = models.IntegerField(verbose_name='Количество достопримечательностей')
+    total_mentions = models.IntegerField(verbose_name='Упоминания в маршрутах')
+
+    class Meta:
+        managed = False
+        db_table = 'category_stats_mv'
+        verbose_name = 'Статистика категории'
+        verbose_name_plural = 'Статистика категорий'
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def refresh(cls, concurrently: bool = True):
+        """Recompute the materialized view without blocking readers."""
+        sql = 'REFRESH MATERIALIZED VIEW {}{}'.format(
+            'CONCURRENTLY ' if concurrently else '',
+            cls._meta.db_table,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
@@ -0,0 +1,12 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class AnalyticsPagination(LimitOffsetPagination):
+    """Limit/offset pagination with a hard cap for analytics lists."""
+    default_limit = 20
+    max_limit = 100
+
+
+class PopularRoutesPagination(AnalyticsPagination):
+    """Pagination for popular routes (top 10 by default)."""
+    default_limit = 10
@@ -0,0 +1,16 @@
+"""
+Celery tasks for analytics.
+"""
+from celery import shared_task
+import logging
+from .models import CategoryStats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_category_stats_task():
+    """Periodic task to refresh the category statistics materialized view."""
+    logger.info('Refreshing category statistics...')
+    CategoryStats.refresh()
+    logger.info('Category statistics refreshed')
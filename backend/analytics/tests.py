@@ -0,0 +1,365 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from attractions.models import Category, Attraction
+from routes.models import Route, RouteAttraction
+from .models import CategoryStats
+from .pagination import PopularRoutesPagination
+from .views import TRENDS_MAX_DAYS
+
+User = get_user_model()
+
+
+class RouteStatisticsAPITest(TestCase):
+    """Tests for route statistics API."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Route.objects.create(
+            name='Маршрут 1',
+            description='Описание',
+            user=self.user,
+            duration_hours=2,
+            views_count=5,
+        )
+        Route.objects.create(
+            name='Маршрут 2',
+            description='Описание',
+            user=self.user,
+            duration_hours=4,
+            views_count=7,
+        )
+
+    def test_route_statistics_total_views(self):
+        """Test total views are summed, not counted."""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/analytics/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_views'], 12)
+        self.assertEqual(response.data['total_routes'], 2)
+        self.assertEqual(response.data['public_routes'], 0)
+        self.assertEqual(response.data['avg_duration'], 3)
+
+    def test_route_statistics_cached(self):
+        """Test repeated requests are served from the cache."""
+        self.client.get('/api/analytics/stats/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/analytics/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_views'], 12)
+
+    def test_user_analytics_total_views(self):
+        """Test user total views are summed, not counted."""
+        response = self.client.get('/api/analytics/user/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_views'], 12)
+        self.assertEqual(response.data['total_routes'], 2)
+
+    def test_user_analytics_top_categories(self):
+        """Test top categories count distinct attractions from user routes."""
+        category = Category.objects.create(name='История', slug='history')
+        attraction = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Описание',
+            latitude=55.8304,
+            longitude=49.0661,
+            category=category,
+        )
+        for order, route in enumerate(Route.objects.filter(user=self.user), start=1):
+            RouteAttraction.objects.create(route=route, attraction=attraction, order=order)
+        response = self.client.get('/api/analytics/user/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['top_categories'], [{'name': 'История', 'count': 1}])
+
+
+class AttractionStatisticsAPITest(TestCase):
+    """Tests for attraction statistics API."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='История', slug='history')
+        for idx, rating in enumerate([0.5, 3.2, 4.1, 5.0]):
+            Attraction.objects.create(
+                name=f'Достопримечательность {idx}',
+                slug=f'attraction-{idx}',
+                description='Описание',
+                latitude=55.8304,
+                longitude=49.0661,
+                category=self.category,
+                rating=rating,
+            )
+
+    def test_rating_distribution(self):
+        """Test rating distribution is computed in a single query."""
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/analytics/attractions/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        distribution = {
+            item['range']: item['count']
+            for item in response.data['rating_distribution']
+        }
+        self.assertEqual(distribution, {'0-1': 1, '1-2': 0, '2-3': 0, '3-4': 1, '4-5': 2})
+
+
+class PopularAttractionsByCategoryAPITest(TestCase):
+    """Tests for popular attractions grouped by category."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.route = Route.objects.create(
+            name='Маршрут',
+            description='Описание',
+            user=self.user,
+            duration_hours=2,
+        )
+        for cat_idx in range(3):
+            category = Category.objects.create(name=f'Категория {cat_idx}', slug=f'category-{cat_idx}')
+            for att_idx in range(3):
+                attraction = Attraction.objects.create(
+                    name=f'Достопримечательность {cat_idx}-{att_idx}',
+                    slug=f'attraction-{cat_idx}-{att_idx}',
+                    description='Описание',
+                    latitude=55.8304,
+                    longitude=49.0661,
+                    category=category,
+                )
+                RouteAttraction.objects.create(
+                    route=self.route,
+                    attraction=attraction,
+                    order=cat_idx * 3 + att_idx + 1,
+                )
+
+    def test_by_category_query_count(self):
+        """Test query count does not grow with the number of categories."""
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/analytics/attractions/by-category/?limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['by_category']), 3)
+        for group in response.data['by_category']:
+            self.assertEqual(len(group['attractions']), 2)
+
+    def test_by_category_limit_validated(self):
+        """Test non-positive limits are clamped and non-integer limits rejected."""
+        response = self.client.get('/api/analytics/attractions/by-category/?limit=-3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for group in response.data['by_category']:
+            self.assertEqual(len(group['attractions']), 1)
+
+        response = self.client.get('/api/analytics/attractions/by-category/?limit=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CategoryStatsTest(TestCase):
+    """Tests for the category statistics materialized view."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='История', slug='history')
+        Category.objects.create(name='Природа', slug='nature')
+        attraction = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Описание',
+            latitude=55.8304,
+            longitude=49.0661,
+            category=self.category,
+        )
+        for idx in range(2):
+            route = Route.objects.create(
+                name=f'Маршрут {idx}',
+                description='Описание',
+                user=self.user,
+                duration_hours=2,
+            )
+            RouteAttraction.objects.create(route=route, attraction=attraction, order=1)
+        CategoryStats.refresh()
+
+    def test_category_popularity(self):
+        """Test category popularity is read from the refreshed view."""
+        response = self.client.get('/api/analytics/categories/popularity/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['categories'], [{
+            'id': self.category.id,
+            'name': 'История',
+            'route_count': 2,
+            'attraction_count': 1,
+        }])
+
+    def test_category_distribution_in_routes(self):
+        """Test category distribution is read from the refreshed view."""
+        response = self.client.get('/api/analytics/categories/in-routes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['distribution'], [{
+            'category': 'История',
+            'category_id': self.category.id,
+            'route_count': 2,
+            'total_mentions': 2,
+        }])
+
+
+class PopularListsAPITest(TestCase):
+    """Tests for popular routes and attractions lists."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='История', slug='history')
+        self.attraction = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Описание',
+            latitude=55.8304,
+            longitude=49.0661,
+            category=self.category,
+            rating=4.8,
+            address='Кремль, Казань',
+        )
+        self.route = Route.objects.create(
+            name='Публичный маршрут',
+            description='Описание',
+            user=self.user,
+            duration_hours=2,
+            is_public=True,
+            views_count=3,
+        )
+        RouteAttraction.objects.create(route=self.route, attraction=self.attraction, order=1)
+
+    def test_popular_routes(self):
+        """Test popular routes include the author's email."""
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/analytics/popular/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['user'], self.user.email)
+        self.assertEqual(response.data['results'][0]['views_count'], 3)
+
+    def test_popular_routes_limit_capped(self):
+        """Test the limit query param is capped by the paginator."""
+        request = Request(APIRequestFactory().get('/api/analytics/popular/', {'limit': 100000}))
+        self.assertEqual(PopularRoutesPagination().get_limit(request), 100)
+
+    def test_popular_attractions(self):
+        """Test popular attractions include category and mention count."""
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/analytics/popular-attractions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{
+            'id': self.attraction.id,
+            'name': 'Казанский Кремль',
+            'mention_count': 1,
+            'category': 'История',
+            'category_id': self.category.id,
+            'rating': 4.8,
+            'address': 'Кремль, Казань',
+        }])
+
+    def test_attraction_usage_trends(self):
+        """Test trends return one entry per day, including empty days."""
+        response = self.client.get('/api/analytics/trends/attractions/?days=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        trends = response.data['trends']
+        self.assertEqual(len(trends), 4)
+        self.assertEqual(trends[-1], {
+            'date': str(timezone.localdate()),
+            'routes_created': 1,
+            'attraction_mentions': 1,
+        })
+        self.assertTrue(all(day['routes_created'] == 0 for day in trends[:-1]))
+
+    def test_attraction_usage_trends_days_clamped(self):
+        """Test the trends window is capped and non-integer days are rejected."""
+        response = self.client.get('/api/analytics/trends/attractions/?days=700000')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['trends']), TRENDS_MAX_DAYS + 1)
+
+        response = self.client.get('/api/analytics/trends/attractions/?days=week')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsQueryCountTest(TestCase):
+    """Guard analytics endpoints against N+1 query regressions."""
+
+    # Maximum number of queries per endpoint, independent of row counts
+    query_budgets = {
+        '/api/analytics/popular/': 2,
+        '/api/analytics/stats/': 3,
+        '/api/analytics/attractions/stats/': 4,
+        '/api/analytics/popular-attractions/': 2,
+        '/api/analytics/categories/popularity/': 1,
+        '/api/analytics/attractions/by-category/': 2,
+        '/api/analytics/trends/attractions/': 1,
+        '/api/analytics/categories/in-routes/': 1,
+        '/api/analytics/user/': 5,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for cat_idx in range(3):
+            category = Category.objects.create(name=f'Категория {cat_idx}', slug=f'category-{cat_idx}')
+            route = Route.objects.create(
+                name=f'Маршрут {cat_idx}',
+                description='Описание',
+                user=self.user,
+                duration_hours=cat_idx + 1,
+                is_public=True,
+            )
+            for att_idx in range(3):
+                attraction = Attraction.objects.create(
+                    name=f'Достопримечательность {cat_idx}-{att_idx}',
+                    slug=f'attraction-{cat_idx}-{att_idx}',
+                    description='Описание',
+                    latitude=55.8304,
+                    longitude=49.0661,
+                    category=category,
+                )
+                RouteAttraction.objects.create(route=route, attraction=attraction, order=att_idx + 1)
+        CategoryStats.refresh()
+
+    def test_query_budgets(self):
+        """Test each endpoint stays within its query budget."""
+        for url, budget in self.query_budgets.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertLessEqual(len(context.captured_queries), budget)
+
@@ -1,41 +1,70 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.http import HttpResponse
-from django.db.models import Count, Avg, Q
+from django.conf import settings
+from django.views.decorators.cache import cache_page
+from django.db import connection
+from django.db.models import Count, Avg, Sum, Q, Prefetch
 from django.utils import timezone
 from datetime import timedelta
 from routes.models import Route, RouteAttraction
 from attractions.models import Attraction, Category
+from .models import CategoryStats
+from .pagination import AnalyticsPagination, PopularRoutesPagination
 
+# Every day of the window is a generated row joined against routes
+TRENDS_DEFAULT_DAYS = 30
+TRENDS_MAX_DAYS = 365
 
+USAGE_TRENDS_SQL = """
+    WITH days AS (
+        SELECT generate_series(%s::date, %s::date, interval '1 day')::date AS day
+    )
+    SELECT days.day, COUNT(DISTINCT r.id), COUNT(ra.id)
+    FROM days
+    LEFT JOIN routes_route r
+        ON r.created_at >= %s AND (r.created_at AT TIME ZONE %s)::date = days.day
+    LEFT JOIN routes_routeattraction ra ON ra.route_id = r.id
+    GROUP BY days.day
+    ORDER BY days.day
+"""
+
+
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def popular_routes(request):
     """Get popular routes based on views."""
-    limit = int(request.query_params.get('limit', 10))
-    
-    routes = Route.objects.filter(is_public=True).order_by('-views_count')[:limit]
+    paginator = PopularRoutesPagination()
+    queryset = Route.objects.filter(is_public=True).values(
+        'id', 'name', 'views_count', 'user__email', 'created_at'
+    ).order_by('-views_count', 'id')
+    routes = paginator.paginate_queryset(queryset, request)
     
     data = [{
-        'id': route.id,
-        'name': route.name,
-        'views_count': route.views_count,
-        'user': route.user.email,
-        'created_at': route.created_at
+        'id': route['id'],
+        'name': route['name'],
+        'views_count': route['views_count'],
+        'user': route['user__email'],
+        'created_at': route['created_at']
     } for route in routes]
     
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def route_statistics(request):
     """Get route statistics."""
-    total_routes = Route.objects.count()
-    public_routes = Route.objects.filter(is_public=True).count()
-    total_views = Route.objects.aggregate(total=Count('views_count'))['total'] or 0
-    avg_duration = Route.objects.aggregate(avg=Avg('duration_hours'))['avg'] or 0
+    totals = Route.objects.aggregate(
+        total_routes=Count('id'),
+        public_routes=Count('id', filter=Q(is_public=True)),
+        total_views=Sum('views_count'),
+        avg_duration=Avg('duration_hours'),
+    )
+    total_views = totals['total_views'] or 0
+    avg_duration = totals['avg_duration'] or 0
     
     # Routes by duration
     duration_stats = Route.objects.values('duration_hours').annotate(
@@ -43,13 +72,11 @@ def route_statistics(request):
     ).order_by('duration_hours')
     
     # Most popular categories
-    category_stats = Category.objects.annotate(
-        route_count=Count('attractions__route_attractions__route', distinct=True)
-    ).order_by('-route_count')[:10]
+    category_stats = CategoryStats.objects.order_by('-route_count')[:10]
     
     return Response({
-        'total_routes': total_routes,
-        'public_routes': public_routes,
+        'total_routes': totals['total_routes'],
+        'public_routes': totals['public_routes'],
         'total_views': total_views,
         'avg_duration': round(avg_duration, 2),
         'duration_distribution': list(duration_stats),
@@ -60,6 +87,7 @@ def route_statistics(request):
     })
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def attraction_statistics(request):
@@ -81,14 +109,18 @@ def attraction_statistics(request):
         (4, 5, '4-5'),
     ]
     
-    rating_dist = []
-    for min_rating, max_rating, label in rating_ranges:
-        count = Attraction.objects.filter(
-            is_active=True,
-            rating__gte=min_rating,
-            rating__lt=max_rating
-        ).count()
-        rating_dist.append({'range': label, 'count': count})
+    # Count all buckets in a single pass (the top bucket includes 5.0)
+    buckets = Attraction.objects.filter(is_active=True).aggregate(**{
+        label: Count('id', filter=(
+            Q(rating__gte=min_rating, rating__lt=max_rating) if max_rating < 5
+            else Q(rating__gte=min_rating, rating__lte=max_rating)
+        ))
+        for min_rating, max_rating, label in rating_ranges
+    })
+    rating_dist = [
+        {'range': label, 'count': buckets[label]}
+        for _, _, label in rating_ranges
+    ]
     
     return Response({
         'total_attractions': total_attractions,
@@ -101,11 +133,12 @@ def attraction_statistics(request):
     })
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def popular_attractions(request):
     """Get popular attractions based on mentions in routes."""
-    limit = int(request.query_params.get('limit', 20))
+    paginator = AnalyticsPagination()
     category_id = request.query_params.get('category_id', None)
     
     # Base queryset: count mentions in routes
@@ -117,30 +150,30 @@ def popular_attractions(request):
     if category_id:
         queryset = queryset.filter(category_id=category_id)
     
-    # Order by mention count and get top N
-    attractions = queryset.select_related('category').order_by('-mention_count')[:limit]
+    # Order by mention count and get the requested page
+    attractions = paginator.paginate_queryset(queryset.values(
+        'id', 'name', 'mention_count', 'category__name', 'category_id', 'rating', 'address'
+    ).order_by('-mention_count', 'id'), request)
     
     data = [{
-        'id': attr.id,
-        'name': attr.name,
-        'mention_count': attr.mention_count,
-        'category': attr.category.name if attr.category else None,
-        'category_id': attr.category.id if attr.category else None,
-        'rating': float(attr.rating),
-        'address': attr.address,
+        'id': attr['id'],
+        'name': attr['name'],
+        'mention_count': attr['mention_count'],
+        'category': attr['category__name'],
+        'category_id': attr['category_id'],
+        'rating': float(attr['rating']),
+        'address': attr['address'],
     } for attr in attractions]
     
-    return Response({'attractions': data})
+    return paginator.get_paginated_response(data)
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def category_popularity(request):
     """Get category popularity based on routes using attractions from each category."""
-    categories = Category.objects.annotate(
-        route_count=Count('attractions__route_attractions__route', distinct=True),
-        attraction_count=Count('attractions', filter=Q(attractions__is_active=True), distinct=True)
-    ).filter(route_count__gt=0).order_by('-route_count')
+    categories = CategoryStats.objects.filter(route_count__gt=0).order_by('-route_count')
     
     data = [{
         'id': cat.id,
@@ -152,27 +185,36 @@ def category_popularity(request):
     return Response({'categories': data})
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def popular_attractions_by_category(request):
     """Get top attractions grouped by category."""
-    limit_per_category = int(request.query_params.get('limit', 5))
+    try:
+        limit_per_category = int(request.query_params.get('limit', 5))
+    except ValueError:
+        return Response({'error': 'limit должен быть целым числом'}, status=400)
+    limit_per_category = max(1, min(limit_per_category, AnalyticsPagination.max_limit))
+    
+    # Fetch mentioned attractions for all categories in one prefetch query
+    top_attractions = Attraction.objects.filter(is_active=True).only(
+        'id', 'name', 'rating', 'category_id'
+    ).annotate(
+        mention_count=Count('route_attractions', distinct=True)
+    ).filter(mention_count__gt=0).order_by('-mention_count')
     
     categories = Category.objects.annotate(
         attraction_count=Count('attractions', filter=Q(attractions__is_active=True))
-    ).filter(attraction_count__gt=0)
+    ).filter(attraction_count__gt=0).prefetch_related(
+        Prefetch('attractions', queryset=top_attractions, to_attr='top_attractions')
+    )
     
     result = []
     for category in categories:
-        # Get top attractions in this category
-        attractions = Attraction.objects.filter(
-            category=category,
-            is_active=True
-        ).annotate(
-            mention_count=Count('route_attractions', distinct=True)
-        ).filter(mention_count__gt=0).order_by('-mention_count')[:limit_per_category]
+        # Prefetch can't slice per category, so take the top N here
+        attractions = category.top_attractions[:limit_per_category]
         
-        if attractions.exists():
+        if attractions:
             result.append({
                 'category': category.name,
                 'category_id': category.id,
@@ -187,37 +229,44 @@ def popular_attractions_by_category(request):
     return Response({'by_category': result})
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def attraction_usage_trends(request):
     """Get trends of attraction usage over time."""
-    days = int(request.query_params.get('days', 30))
+    try:
+        days = int(request.query_params.get('days', TRENDS_DEFAULT_DAYS))
+    except ValueError:
+        return Response({'error': 'days должен быть целым числом'}, status=400)
+    days = max(1, min(days, TRENDS_MAX_DAYS))
     start_date = timezone.now() - timedelta(days=days)
     
-    # Get routes created in the period
-    routes = Route.objects.filter(created_at__gte=start_date).values('created_at__date').annotate(
-        route_count=Count('id', distinct=True),
-        attraction_mentions=Count('route_attractions', distinct=True)
-    ).order_by('created_at__date')
+    # One query over a dense calendar so days without routes come back as zeros
+    with connection.cursor() as cursor:
+        cursor.execute(USAGE_TRENDS_SQL, [
+            timezone.localdate(start_date),
+            timezone.localdate(),
+            start_date,
+            timezone.get_current_timezone_name(),
+        ])
+        rows = cursor.fetchall()
     
     data = [{
-        'date': str(route['created_at__date']),
-        'routes_created': route['route_count'],
-        'attraction_mentions': route['attraction_mentions'],
-    } for route in routes]
+        'date': str(day),
+        'routes_created': route_count,
+        'attraction_mentions': attraction_mentions,
+    } for day, route_count, attraction_mentions in rows]
     
     return Response({'trends': data})
 
 
+@cache_page(settings.ANALYTICS_CACHE_TIMEOUT)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def category_distribution_in_routes(request):
     """Get distribution of categories in routes."""
     # Count how many routes use each category
-    categories = Category.objects.annotate(
-        route_count=Count('attractions__route_attractions__route', distinct=True),
-        total_mentions=Count('attractions__route_attractions', distinct=True)
-    ).filter(route_count__gt=0).order_by('-route_count')
+    categories = CategoryStats.objects.filter(route_count__gt=0).order_by('-route_count')
     
     data = [{
         'category': cat.name,
@@ -237,22 +286,17 @@ def user_analytics(request):
     
     user_routes = Route.objects.filter(user=user)
     total_routes = user_routes.count()
-    total_views = user_routes.aggregate(total=Count('views_count'))['total'] or 0
+    total_views = user_routes.aggregate(total=Sum('views_count'))['total'] or 0
     favorite_routes = user_routes.filter(is_favorite=True).count()
     
     # Routes created over time
     last_30_days = timezone.now() - timedelta(days=30)
     routes_created = user_routes.filter(created_at__gte=last_30_days).count()
     
-    # Most used categories
-    user_attractions = Attraction.objects.filter(
-        route_attractions__route__user=user
-    ).distinct()
-    
-    category_usage = Category.objects.filter(
-        attractions__in=user_attractions
-    ).annotate(
-        usage_count=Count('attractions', filter=Q(attractions__in=user_attractions))
+    # Most used categories (distinct attractions from the user's routes)
+    user_filter = Q(attractions__route_attractions__route__user=user)
+    category_usage = Category.objects.filter(user_filter).annotate(
+        usage_count=Count('attractions', filter=user_filter, distinct=True)
     ).order_by('-usage_count')[:5]
     
     return Response({
@@ -5,3 +5,5 @@ class AttractionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attractions'
 
+    def ready(self):
+        from . import signals  # noqa: F401
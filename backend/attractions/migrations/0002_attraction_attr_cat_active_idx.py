@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attraction',
+            index=models.Index(fields=['category', 'is_active'], name='attr_cat_active_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:48
+
+import attractions.models
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0002_attraction_attr_cat_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attraction',
+            index=django.contrib.postgres.indexes.SpGistIndex(attractions.models.PgPoint(django.db.models.functions.comparison.Cast('longitude', models.FloatField()), django.db.models.functions.comparison.Cast('latitude', models.FloatField())), name='attr_loc_spgist'),
+        ),
+    ]
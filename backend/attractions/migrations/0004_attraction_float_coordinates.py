@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:50
+
+import attractions.models
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0003_attraction_attr_loc_spgist'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attraction',
+            name='attr_loc_spgist',
+        ),
+        migrations.AlterField(
+            model_name='attraction',
+            name='latitude',
+            field=models.FloatField(verbose_name='Широта'),
+        ),
+        migrations.AlterField(
+            model_name='attraction',
+            name='longitude',
+            field=models.FloatField(verbose_name='Долгота'),
+        ),
+        migrations.AddIndex(
+            model_name='attraction',
+            index=django.contrib.postgres.indexes.SpGistIndex(attractions.models.PgPoint('longitude', 'latitude'), name='attr_loc_spgist'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0004_attraction_float_coordinates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attraction',
+            name='attractions_latitud_1361ce_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='attraction',
+            name='attractions_categor_487ed2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='attraction',
+            name='attractions_rating_515bc1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='attraction',
+            index=models.Index(fields=['is_active', '-rating', 'name'], name='attr_active_rating_name'),
+        ),
+    ]
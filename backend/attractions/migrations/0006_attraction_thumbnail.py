@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0005_attraction_attr_active_rating_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attraction',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='attractions/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -1,7 +1,33 @@
 from django.db import models
+from django.db.models import Func
+from django.contrib.postgres.indexes import SpGistIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
+class PgPoint(Func):
+    """PostgreSQL native ``point(x, y)``."""
+    function = 'point'
+    output_field = models.Field()
+
+
+class PgBox(Func):
+    """PostgreSQL native ``box(corner, corner)``."""
+    function = 'box'
+    output_field = models.Field()
+
+
+class ContainedIn(Func):
+    """``a <@ b`` containment test, usable directly in ``filter()``."""
+    template = '(%(expressions)s)'
+    arg_joiner = ' <@ '
+    output_field = models.BooleanField()
+
+
+def attraction_location():
+    """Attraction location as a native point, matching the spatial index expression."""
+    return PgPoint('longitude', 'latitude')
+
+
 class Category(models.Model):
     """Category for attractions."""
     name = models.CharField(max_length=100, unique=True, verbose_name='Название')
@@ -26,8 +52,8 @@ class Attraction(models.Model):
     short_description = models.CharField(max_length=500, blank=True, null=True, verbose_name='Краткое описание')
     
     # Location
-    latitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name='Широта')
-    longitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name='Долгота')
+    latitude = models.FloatField(verbose_name='Широта')
+    longitude = models.FloatField(verbose_name='Долгота')
     address = models.CharField(max_length=300, blank=True, null=True, verbose_name='Адрес')
     
     # Metadata
@@ -45,6 +71,13 @@ class Attraction(models.Model):
     
     # Media
     image = models.ImageField(upload_to='attractions/', blank=True, null=True, verbose_name='Изображение')
+    thumbnail = models.ImageField(
+        upload_to='attractions/thumbnails/',
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Миниатюра'
+    )
     website = models.URLField(blank=True, null=True, verbose_name='Веб-сайт')
     
     # Timestamps
@@ -57,11 +90,20 @@ class Attraction(models.Model):
         verbose_name_plural = 'Достопримечательности'
         ordering = ['-rating', 'name']
         indexes = [
-            models.Index(fields=['latitude', 'longitude']),
-            models.Index(fields=['category']),
-            models.Index(fields=['rating']),
+            models.Index(fields=['is_active', '-rating', 'name'], name='attr_active_rating_name'),
+            models.Index(fields=['category', 'is_active'], name='attr_cat_active_idx'),
+            SpGistIndex(attraction_location(), name='attr_loc_spgist'),
         ]
 
     def __str__(self):
         return self.name
 
+    def fill_short_description(self):
+        """Default a blank short description to the start of the description."""
+        if not self.short_description and self.description:
+            max_length = self._meta.get_field('short_description').max_length
+            self.short_description = self.description[:max_length]
+
+    def save(self, *args, **kwargs):
+        self.fill_short_description()
+        super().save(*args, **kwargs)
@@ -0,0 +1,8 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AttractionCursorPagination(CursorPagination):
+    """Cursor pagination for attraction lists; skips the COUNT(*) per page."""
+    page_size = 20
+    # Matches the (is_active, -rating, name) index; id breaks remaining ties
+    ordering = ('-rating', 'name', 'id')
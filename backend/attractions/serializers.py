@@ -34,6 +34,7 @@ class AttractionSerializer(serializers.ModelSerializer):
 class AttractionListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for attraction lists."""
     category = CategorySerializer(read_only=True)
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = Attraction
@@ -43,3 +44,10 @@ class AttractionListSerializer(serializers.ModelSerializer):
             'visit_duration', 'price', 'is_free', 'image'
         )
 
+    def get_image(self, obj):
+        """Thumbnail URL, or the original image until the thumbnail is generated."""
+        image = obj.thumbnail or obj.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
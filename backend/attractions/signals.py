@@ -0,0 +1,53 @@
+import os
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Attraction, Category
+from .tasks import generate_thumbnail_task, thumbnail_name
+
+CATEGORY_CACHE_VERSION_KEY = 'attractions:categories:version'
+ATTRACTION_CACHE_VERSION_KEY = 'attractions:attractions:version'
+
+
+def get_category_cache_version() -> int:
+    """Current version of cached category responses."""
+    return cache.get_or_set(CATEGORY_CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def get_attraction_cache_version() -> int:
+    """Current version of data cached from attraction rows."""
+    return cache.get_or_set(ATTRACTION_CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    """Bump the version so stale category responses are no longer read."""
+    _bump_version(CATEGORY_CACHE_VERSION_KEY)
+
+
+@receiver(post_save, sender=Attraction)
+@receiver(post_delete, sender=Attraction)
+def invalidate_attraction_cache(sender, **kwargs):
+    """Bump the version so data cached from attractions is rebuilt."""
+    _bump_version(ATTRACTION_CACHE_VERSION_KEY)
+
+
+@receiver(post_save, sender=Attraction)
+def schedule_thumbnail(sender, instance, **kwargs):
+    """Queue thumbnail generation when the image changes."""
+    if not instance.image:
+        if instance.thumbnail:
+            Attraction.objects.filter(pk=instance.pk).update(thumbnail=None)
+        return
+    if instance.thumbnail and os.path.basename(instance.thumbnail.name) == thumbnail_name(instance.image.name):
+        return
+    transaction.on_commit(lambda: generate_thumbnail_task.delay(instance.pk))
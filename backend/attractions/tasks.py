@@ -0,0 +1,49 @@
+"""
+Celery tasks for attractions.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+from celery import shared_task
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .models import Attraction
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_name(image_name):
+    """Thumbnail file name derived from the original image name."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    # Images sharing a stem (kremlin.jpg, kremlin.png) must not share a thumbnail
+    digest = hashlib.blake2b(image_name.encode(), digest_size=4).hexdigest()
+    return f'{stem}-{digest}.webp'
+
+
+@shared_task
+def generate_thumbnail_task(attraction_id):
+    """Render a small WebP thumbnail of the attraction image for list/map views."""
+    attraction = Attraction.objects.filter(pk=attraction_id).only('image').first()
+    if attraction is None or not attraction.image:
+        return
+
+    with attraction.image.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='WEBP', quality=THUMBNAIL_QUALITY)
+
+    field = Attraction._meta.get_field('thumbnail')
+    target = field.generate_filename(attraction, thumbnail_name(attraction.image.name))
+    # Overwrite rather than let storage pick a suffixed name
+    field.storage.delete(target)
+    name = field.storage.save(target, ContentFile(buffer.getvalue()))
+    # update() rather than save(): no post_save re-trigger, updated_at untouched
+    Attraction.objects.filter(pk=attraction_id).update(thumbnail=name)
+    logger.info('Thumbnail generated for attraction %s', attraction_id)
@@ -1,8 +1,17 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from .models import Category, Attraction
+from .tasks import generate_thumbnail_task, thumbnail_name
 
 User = get_user_model()
 
@@ -52,6 +61,17 @@ class AttractionModelTest(TestCase):
         self.assertEqual(attraction.category, self.category)
         self.assertEqual(attraction.rating, 4.8)
 
+    def test_short_description_defaults_to_description(self):
+        """Test a blank short description is filled from the description on save."""
+        attraction = Attraction.objects.create(
+            name='Башня Сююмбике',
+            slug='syuyumbike-tower',
+            description='Leaning tower. ' * 50,
+            latitude=55.8304,
+            longitude=49.0661,
+        )
+        self.assertEqual(attraction.short_description, attraction.description[:500])
+
     def test_attraction_str(self):
         """Test attraction string representation."""
         attraction = Attraction.objects.create(
@@ -68,6 +88,7 @@ class AttractionAPITest(TestCase):
     """Tests for Attraction API."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.category = Category.objects.create(name='История', slug='history')
         self.attraction = Attraction.objects.create(
@@ -82,9 +103,63 @@ class AttractionAPITest(TestCase):
 
     def test_list_attractions(self):
         """Test listing attractions."""
-        response = self.client.get('/api/attractions/')
+        other_category = Category.objects.create(name='Культура', slug='culture')
+        Attraction.objects.create(
+            name='Театр Камала',
+            slug='kamal-theatre',
+            description='Татарский академический театр',
+            latitude=55.7857,
+            longitude=49.1147,
+            category=other_category,
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/attractions/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreater(len(response.data['results']), 0)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotIn('count', response.data)
+
+    def test_list_cursor_pages(self):
+        """Test the list walks pages with the next cursor."""
+        for i in range(25):
+            Attraction.objects.create(
+                name=f'Место {i:02d}',
+                slug=f'place-{i}',
+                description='Описание',
+                latitude=55.79,
+                longitude=49.12,
+                rating=4.0,
+            )
+        first = self.client.get('/api/attractions/')
+        self.assertEqual(len(first.data['results']), 20)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 6)
+        self.assertIsNone(second.data['next'])
+        ids = [item['id'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(len(set(ids)), 26)
+
+    def test_list_skips_unrendered_columns(self):
+        """Test the list query doesn't load the description column."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/attractions/')
+        self.assertNotIn('"attractions_attraction"."description"', queries[-1]['sql'])
+
+    def test_list_categories(self):
+        """Test listing categories takes a single query."""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/attractions/categories/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['name'], self.category.name)
+
+    def test_list_categories_cached(self):
+        """Test category list is cached until a category changes."""
+        self.client.get('/api/attractions/categories/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/attractions/categories/')
+        self.assertEqual(len(response.data), 1)
+
+        Category.objects.create(name='Культура', slug='culture')
+        response = self.client.get('/api/attractions/categories/')
+        self.assertEqual(len(response.data), 2)
 
     def test_get_attraction(self):
         """Test getting single attraction."""
@@ -100,3 +175,132 @@ class AttractionAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(len(response.data['results']), 0)
 
+    def test_nearby(self):
+        """Test nearby returns attractions within the radius ordered by distance."""
+        near = Attraction.objects.create(
+            name='Башня Сююмбике',
+            slug='syuyumbike-tower',
+            description='Падающая башня',
+            latitude=55.8310,
+            longitude=49.0670,
+            category=self.category,
+        )
+        # Inside the bounding box corner but outside the 1 km radius
+        Attraction.objects.create(
+            name='Дальняя точка',
+            slug='far-point',
+            description='Описание',
+            latitude=55.8384,
+            longitude=49.0801,
+            category=self.category,
+        )
+        response = self.client.get('/api/attractions/nearby/?lat=55.8305&lng=49.0662&radius=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            [self.attraction.id, near.id]
+        )
+        self.assertEqual(response.data[0]['category_slug'], 'history')
+        self.assertIsNone(response.data[0]['image'])
+
+    def test_nearby_limit(self):
+        """Test nearby returns only the `limit` closest attractions."""
+        Attraction.objects.create(
+            name='Башня Сююмбике',
+            slug='syuyumbike-tower',
+            description='Падающая башня',
+            latitude=55.8310,
+            longitude=49.0670,
+            category=self.category,
+        )
+        response = self.client.get('/api/attractions/nearby/?lat=55.8305&lng=49.0662&radius=1&limit=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [self.attraction.id])
+
+    def test_nearby_requires_coordinates(self):
+        """Test nearby without coordinates returns 400."""
+        response = self.client.get('/api/attractions/nearby/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nearby_invalid_parameters(self):
+        """Test malformed or out-of-range coordinates and radius return 400."""
+        for query in ('lat=north&lng=49.0662', 'lat=55.8305&lng=49.0662&radius=far',
+                      'lat=95&lng=49.0662', 'lat=55.8305&lng=49.0662&radius=nan'):
+            response = self.client.get(f'/api/attractions/nearby/?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_nearby_radius_clamped(self):
+        """Test negative radii find nothing and huge radii are capped."""
+        response = self.client.get('/api/attractions/nearby/?lat=55.8305&lng=49.0662&radius=-5')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+        # Moscow is ~720 km away, well past the cap
+        response = self.client.get('/api/attractions/nearby/?lat=55.7558&lng=37.6173&radius=100000')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+
+class AttractionThumbnailTest(TestCase):
+    """Tests for attraction thumbnail generation."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, format='JPEG')
+        self.attraction = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Историческая крепость',
+            latitude=55.8304,
+            longitude=49.0661,
+            image=SimpleUploadedFile('kremlin.jpg', buffer.getvalue(), content_type='image/jpeg'),
+        )
+
+    def test_generate_thumbnail(self):
+        """Test the task stores a 320px WebP thumbnail."""
+        generate_thumbnail_task(self.attraction.id)
+        self.attraction.refresh_from_db()
+        self.assertEqual(
+            self.attraction.thumbnail.name,
+            f'attractions/thumbnails/{thumbnail_name(self.attraction.image.name)}'
+        )
+        with Image.open(self.attraction.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (320, 213))
+
+    def test_list_serves_thumbnail(self):
+        """Test the list returns the thumbnail URL once generated."""
+        generate_thumbnail_task(self.attraction.id)
+        response = APIClient().get('/api/attractions/')
+        self.assertTrue(response.data['results'][0]['image'].endswith(
+            f'/media/attractions/thumbnails/{thumbnail_name(self.attraction.image.name)}'
+        ))
+
+    def test_thumbnails_of_images_sharing_a_stem(self):
+        """Test attractions whose images differ only in extension keep their own thumbnails."""
+        buffer = BytesIO()
+        Image.new('RGB', (400, 400), 'blue').save(buffer, format='PNG')
+        other = Attraction.objects.create(
+            name='Кремль ночью',
+            slug='kremlin-night',
+            description='Подсветка крепости',
+            latitude=55.8304,
+            longitude=49.0661,
+            image=SimpleUploadedFile('kremlin.png', buffer.getvalue(), content_type='image/png'),
+        )
+        generate_thumbnail_task(self.attraction.id)
+        generate_thumbnail_task(other.id)
+        self.attraction.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertNotEqual(self.attraction.thumbnail.name, other.thumbnail.name)
+        with Image.open(self.attraction.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 213))
+        with Image.open(other.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 320))
@@ -1,8 +1,31 @@
 from rest_framework import viewsets, filters, permissions
 from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Attraction
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+import math
+from .models import Category, Attraction, ContainedIn, PgBox, PgPoint, attraction_location
+from .pagination import AttractionCursorPagination
 from .serializers import CategorySerializer, AttractionSerializer, AttractionListSerializer
+from .signals import get_category_cache_version
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_distance(lat: float, lng: float):
+    """Database expression for the distance in km from (lat, lng) to each attraction."""
+    lat_rad = Value(math.radians(lat))
+    lng_rad = Value(math.radians(lng))
+    row_lat = Radians('latitude')
+    row_lng = Radians('longitude')
+    a = (
+        Power(Sin((row_lat - lat_rad) / 2), 2) +
+        Cos(lat_rad) * Cos(row_lat) * Power(Sin((row_lng - lng_rad) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0)))
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -11,6 +34,39 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    cache_timeout = 60 * 60
+
+    def _cached(self, handler, request, *args, **kwargs):
+        """Serve the response from the cache, keyed by URL and category version."""
+        key = f'attractions:categories:{request.get_full_path()}'
+        version = get_category_cache_version()
+        data = cache.get(key, version=version)
+        if data is None:
+            data = handler(request, *args, **kwargs).data
+            cache.set(key, data, self.cache_timeout, version=version)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+
+# Columns rendered by AttractionListSerializer; keep the two in sync or the
+# serializer will fetch each deferred field with an extra query per row
+LIST_FIELDS = (
+    'id', 'name', 'slug', 'short_description', 'latitude', 'longitude',
+    'category', 'rating', 'visit_duration', 'price', 'is_free', 'image', 'thumbnail',
+)
+
+
+NEARBY_FIELDS = ('id', 'name', 'slug', 'latitude', 'longitude', 'rating', 'image', 'thumbnail', 'distance')
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 200
+NEARBY_DEFAULT_RADIUS_KM = 5.0
+# Larger boxes stop being selective enough for the location index
+NEARBY_MAX_RADIUS_KM = 50.0
 
 
 class AttractionViewSet(viewsets.ModelViewSet):
@@ -21,7 +77,18 @@ class AttractionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'is_free']
     search_fields = ['name', 'description', 'address']
     ordering_fields = ['rating', 'name', 'created_at']
-    ordering = ['-rating', 'name']
+    ordering = ['-rating', 'name', 'id']
+    pagination_class = AttractionCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Serializers render the nested category
+            queryset = queryset.select_related('category')
+        if self.action == 'list':
+            # Skip columns AttractionListSerializer doesn't render (description etc.)
+            queryset = queryset.only(*LIST_FIELDS)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -33,7 +100,11 @@ class AttractionViewSet(viewsets.ModelViewSet):
         """Get attractions near a location."""
         latitude = request.query_params.get('lat')
         longitude = request.query_params.get('lng')
-        radius = float(request.query_params.get('radius', 5.0))  # km
+        try:
+            limit = int(request.query_params.get('limit', NEARBY_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit должен быть целым числом'}, status=400)
+        limit = max(1, min(limit, NEARBY_MAX_LIMIT))
 
         if not latitude or not longitude:
             return Response(
@@ -41,20 +112,38 @@ class AttractionViewSet(viewsets.ModelViewSet):
                 status=400
             )
 
-        # Simple distance calculation (Haversine would be better)
-        # For now, using approximate filtering
-        lat = float(latitude)
-        lng = float(longitude)
+        try:
+            lat = float(latitude)
+            lng = float(longitude)
+            radius = float(request.query_params.get('radius', NEARBY_DEFAULT_RADIUS_KM))  # km
+        except ValueError:
+            return Response({'error': 'lat, lng и radius должны быть числами'}, status=400)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and math.isfinite(radius)):
+            return Response({'error': 'Некорректные координаты или радиус'}, status=400)
+        radius = max(0.0, min(radius, NEARBY_MAX_RADIUS_KM))
         
-        # Approximate: 1 degree ≈ 111 km
+        # Bounding box prefilter (1 degree of latitude ≈ 111 km); served by
+        # the SP-GiST location index before the exact distance check
         lat_range = radius / 111.0
-        lng_range = radius / (111.0 * abs(lat / 90.0) if lat != 0 else 111.0)
-
-        attractions = self.queryset.filter(
-            latitude__range=(lat - lat_range, lat + lat_range),
-            longitude__range=(lng - lng_range, lng + lng_range)
+        lng_range = radius / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        bbox = PgBox(
+            PgPoint(Value(lng - lng_range), Value(lat - lat_range)),
+            PgPoint(Value(lng + lng_range), Value(lat + lat_range)),
         )
-        
-        serializer = self.get_serializer(attractions, many=True)
-        return Response(serializer.data)
+
+        attractions = self.get_queryset().filter(
+            ContainedIn(attraction_location(), bbox)
+        ).annotate(
+            distance=haversine_distance(lat, lng)
+        ).filter(distance__lte=radius).order_by('distance').values(
+            *NEARBY_FIELDS, category_slug=F('category__slug')
+        )[:limit]
+
+        # Flat map markers: plain dicts skip model instances and the serializer
+        storage = Attraction._meta.get_field('image').storage
+        results = list(attractions)
+        for item in results:
+            image = item.pop('thumbnail') or item['image']
+            item['image'] = request.build_absolute_uri(storage.url(image)) if image else None
+        return Response(results)
 
@@ -0,0 +1,25 @@
+"""
+Centralized API exception handling.
+"""
+import logging
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+logger = logging.getLogger(__name__)
+
+
+def custom_handler(exc, context):
+    """
+    DRF's handler for API exceptions, plus a JSON 500 for unexpected errors.
+    """
+    response = exception_handler(exc, context)
+    if response is not None:
+        return response
+
+    view = context.get('view')
+    logger.error("Unhandled error in %s", type(view).__name__, exc_info=exc)
+    return Response(
+        {'error': 'Внутренняя ошибка сервера'},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
@@ -0,0 +1,29 @@
+"""
+Perplexity helpers shared by the apps that talk to the LLM.
+"""
+import functools
+import json
+from typing import Dict, Optional
+
+JSON_DECODER = json.JSONDecoder()
+
+
+@functools.lru_cache(maxsize=None)
+def get_perplexity_client(api_key: str):
+    """One Perplexity client per key and process, so its HTTP connection pool stays warm."""
+    from perplexity import Perplexity
+
+    return Perplexity(api_key=api_key)
+
+
+def parse_json_object(content: str) -> Optional[Dict]:
+    """First JSON object in an LLM reply, ignoring any prose around it."""
+    # raw_decode stops at the end of the first balanced object in one linear pass
+    start = content.find('{')
+    if start == -1:
+        return None
+    try:
+        data, _ = JSON_DECODER.raw_decode(content, start)
+    except ValueError:
+        return None
+    return data
@@ -0,0 +1,24 @@
+"""
+Fast JSON renderer for API responses.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer which serializes to JSON using orjson.
+    """
+    # Datetimes go through DRF's encoder to keep its ISO 8601 format
+    options = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            # Pretty-printed output (e.g. browsable API) is not on the hot path
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=self.encoder_class().default, option=self.options)
@@ -6,26 +6,36 @@ from django.utils.deprecation import MiddlewareMixin
 
 logger = logging.getLogger(__name__)
 
+API_PREFIX = '/api/'
+
 
 class RequestLoggingMiddleware(MiddlewareMixin):
     """
     Middleware to log all API requests.
     """
+    def _should_log(self, request):
+        return logger.isEnabledFor(logging.INFO) and request.path.startswith(API_PREFIX)
+
     def process_request(self, request):
-        if request.path.startswith('/api/'):
+        if self._should_log(request):
+            # Log the declared body size only: reading request.body here would
+            # consume the stream before the view's parser gets to it
             logger.info(
-                f"API Request: {request.method} {request.path} | "
-                f"Origin: {request.META.get('HTTP_ORIGIN', 'N/A')} | "
-                f"Content-Type: {request.META.get('CONTENT_TYPE', 'N/A')} | "
-                f"Body: {getattr(request, 'body', b'').decode('utf-8', errors='ignore')[:200]}"
+                "API Request: %s %s | Origin: %s | Content-Type: %s | Content-Length: %s",
+                request.method,
+                request.path,
+                request.META.get('HTTP_ORIGIN', 'N/A'),
+                request.META.get('CONTENT_TYPE', 'N/A'),
+                request.META.get('CONTENT_LENGTH') or 0,
             )
         return None
 
     def process_response(self, request, response):
-        if request.path.startswith('/api/'):
+        if self._should_log(request):
             logger.info(
-                f"API Response: {request.method} {request.path} | "
-                f"Status: {response.status_code}"
+                "API Response: %s %s | Status: %s",
+                request.method,
+                request.path,
+                response.status_code,
             )
         return response
-
@@ -45,11 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so CORS preflights are answered before any other middleware runs
+    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-    'config.request_logging.RequestLoggingMiddleware',  # Log all API requests
     'django.middleware.common.CommonMiddleware',
     'config.middleware.DisableCSRFForAPI',  # Disable CSRF for API before CSRF middleware
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +58,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request API logging is a debugging aid; in production nginx/gunicorn
+# access logs already cover it
+if DEBUG:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('corsheaders.middleware.CorsMiddleware') + 1,
+        'config.request_logging.RequestLoggingMiddleware',
+    )
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -129,6 +137,11 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # Reuse connections across requests instead of reconnecting each time
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        # Required when connecting through PgBouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
     }
 }
 
@@ -141,11 +154,23 @@ CACHES = {
     }
 }
 
+# Public analytics endpoints are cached per URL (including query params)
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv('ANALYTICS_CACHE_TIMEOUT', '120'))
+
 # Session backend (optional, using Redis)
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
 
+# Password hashing: tuned Argon2id first, PBKDF2 kept so existing hashes
+# still verify and get upgraded on the next successful login
+PASSWORD_HASHERS = [
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -197,8 +222,12 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -208,6 +237,10 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'EXCEPTION_HANDLER': 'config.exception_handler.custom_handler',
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('LOGIN_THROTTLE_RATE', '5/min'),
+    },
 }
 
 # JWT Settings
@@ -277,6 +310,8 @@ if DEBUG:
 # Perplexity API Key
 PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY', '')
 PERPLEXITY_MODEL = os.getenv('PERPLEXITY_MODEL', 'sonar-pro')
+# Second LLM call to recover attractions from the description when a reply has none
+PERPLEXITY_EXTRACT_FALLBACK = os.getenv('PERPLEXITY_EXTRACT_FALLBACK', 'False') == 'True'
 
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
@@ -285,4 +320,12 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
-
+# Queue consumed by workers with Chrome installed; renders pages whose
+# listings are filled in by JavaScript
+SCRAPER_BROWSER_QUEUE = os.getenv('SCRAPER_BROWSER_QUEUE', 'celery')
+CELERY_BEAT_SCHEDULE = {
+    'refresh-category-stats': {
+        'task': 'analytics.tasks.refresh_category_stats_task',
+        'schedule': timedelta(minutes=5),
+    },
+}
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from .exception_handler import custom_handler
+from .llm import get_perplexity_client, parse_json_object
+from .renderers import ORJSONRenderer
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """Tests for ORJSONRenderer."""
+
+    def test_matches_default_renderer(self):
+        """Test output matches DRF's JSONRenderer for API payloads."""
+        data = {
+            'name': 'Казанский Кремль',
+            'rating': Decimal('4.80'),
+            'created_at': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            'items': [1, 2.5, None, True],
+        }
+        rendered = ORJSONRenderer().render(data)
+        expected = JSONRenderer().render(data)
+        self.assertEqual(rendered, expected)
+
+    def test_render_none(self):
+        """Test None renders as an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class CustomExceptionHandlerTest(SimpleTestCase):
+    """Tests for the API exception handler."""
+
+    def test_api_exception_passthrough(self):
+        """Test DRF exceptions keep their status and detail."""
+        response = custom_handler(NotFound(), {})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unexpected_error(self):
+        """Test unexpected errors become a logged JSON 500."""
+        with self.assertLogs('config.exception_handler', level='ERROR'):
+            response = custom_handler(RuntimeError('boom'), {})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertNotIn('boom', response.data['error'])
+
+
+class LLMHelpersTest(SimpleTestCase):
+    """Tests for the shared Perplexity helpers."""
+
+    def test_perplexity_client_reused(self):
+        """Test the Perplexity client is built once per API key."""
+        self.addCleanup(get_perplexity_client.cache_clear)
+        self.assertIs(get_perplexity_client('test-key'), get_perplexity_client('test-key'))
+
+    def test_parse_json_object(self):
+        """Test the first JSON object is extracted from a reply wrapped in prose."""
+        content = 'Вот данные: {"description": "Музей {Кремль}", "price": 0} Источник: {1}'
+        self.assertEqual(parse_json_object(content), {'description': 'Музей {Кремль}', 'price': 0})
+        self.assertIsNone(parse_json_object('Нет данных'))
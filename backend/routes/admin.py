@@ -6,11 +6,13 @@ class RouteAttractionInline(admin.TabularInline):
     model = RouteAttraction
     extra = 1
     ordering = ['order']
+    autocomplete_fields = ['attraction']
 
 
 @admin.register(Route)
 class RouteAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'duration_hours', 'budget', 'is_public', 'views_count', 'created_at']
+    list_select_related = ['user']
     list_filter = ['is_public', 'is_favorite', 'created_at']
     search_fields = ['name', 'description', 'user__email']
     inlines = [RouteAttractionInline]
@@ -20,13 +22,18 @@ class RouteAdmin(admin.ModelAdmin):
 @admin.register(RouteAttraction)
 class RouteAttractionAdmin(admin.ModelAdmin):
     list_display = ['route', 'attraction', 'order', 'visit_duration']
-    list_filter = ['route', 'attraction']
+    # Route.__str__ includes the owner's email
+    list_select_related = ['route__user', 'attraction']
+    # FK filters would list every route and attraction on each page render
+    list_filter = ['route__created_at']
+    autocomplete_fields = ['route', 'attraction']
     ordering = ['route', 'order']
 
 
 @admin.register(UserPreference)
 class UserPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'preferred_duration_min', 'preferred_duration_max', 'max_budget']
+    list_select_related = ['user']
     search_fields = ['user__email']
     filter_horizontal = ['preferred_categories']
 
@@ -1,20 +1,271 @@
 """
 Route generation modules using LLM and algorithms.
 """
-import math
+import hashlib
 import logging
-import json
+import math
 import re
 from typing import List, Dict, Optional
 from decimal import Decimal
+import numpy as np
+from rapidfuzz import fuzz, process
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Substr
+from django.utils.text import slugify
 from attractions.models import Attraction, Category
+from attractions.signals import get_attraction_cache_version, get_category_cache_version
+from config.llm import get_perplexity_client, parse_json_object
 from routes.models import Route, RouteAttraction, UserPreference
 
 logger = logging.getLogger(__name__)
 
+# Keywords are matched as substrings of the lowercased text. Each table is
+# compiled into one regex scanned once per text; the lookahead lets matches
+# overlap, so keywords of different groups must not be prefixes of each other.
+PLACE_TYPE_KEYWORDS = {
+    'attractions': ['достопримечательность', 'памятник', 'архитектур', 'исторический', 'культурный', 'экскурсия', 'обзор'],
+    'restaurants': ['ресторан', 'рестораны', 'еда', 'кухня', 'гастроном', 'обед', 'ужин', 'трапеза'],
+    'bars': ['бар', 'бары', 'паб', 'пабы', 'пивной', 'коктейль', 'напиток', 'алкоголь'],
+    'cafes': ['кафе', 'кофе', 'кофейня', 'завтрак', 'перекус', 'десерт'],
+    'museums': ['музей', 'музеи', 'экспозиция', 'выставка', 'коллекция', 'галерея'],
+    'parks': ['парк', 'парки', 'сквер', 'скверы', 'природа', 'набережная', 'прогулка'],
+    'entertainment': ['развлечение', 'развлечения', 'клуб', 'клубы', 'кинотеатр', 'театр', 'концерт'],
+    'shopping': ['магазин', 'магазины', 'торговый', 'шоппинг', 'покупка', 'сувенир'],
+    'hotels': ['отель', 'отели', 'гостиница', 'размещение', 'ночлег']
+}
+
+# Route name themes in priority order: (keywords, prompt instruction)
+ROUTE_THEMES = [
+    (['бар', 'бары', 'клуб', 'клубы', 'развлечения', 'ночная'],
+     "ВАЖНО: Маршрут должен быть посвящен барам, клубам и ночным развлечениям Казани. Выбери бары, пабы, клубы и развлекательные заведения."),
+    (['еда', 'ресторан', 'кафе', 'кухня', 'гастроном'],
+     "ВАЖНО: Маршрут должен быть посвящен гастрономии Казани. Выбери рестораны, кафе и места с местной кухней."),
+    (['история', 'исторический', 'музей', 'памятник'],
+     "ВАЖНО: Маршрут должен быть посвящен истории и культуре Казани. Выбери исторические достопримечательности и музеи."),
+    (['природа', 'парк', 'сквер', 'набережная'],
+     "ВАЖНО: Маршрут должен быть посвящен природе и паркам Казани. Выбери парки, скверы и природные достопримечательности."),
+]
+
+
+def _compile_keywords(keywords):
+    """Single-pass regex reporting every keyword occurrence, longest first."""
+    alternation = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))')
+
+
+PLACE_TYPE_BY_KEYWORD = {k: place_type for place_type, keywords in PLACE_TYPE_KEYWORDS.items() for k in keywords}
+PLACE_TYPE_RE = _compile_keywords(PLACE_TYPE_BY_KEYWORD)
+THEME_BY_KEYWORD = {k: index for index, (keywords, _) in enumerate(ROUTE_THEMES) for k in keywords}
+THEME_RE = _compile_keywords(THEME_BY_KEYWORD)
+
+# Static part of the route prompt, sent as the system message; the reply
+# shape is also enforced through ROUTE_RESPONSE_SCHEMA
+ROUTE_SYSTEM_PROMPT = """Ты помощник по планированию туристических маршрутов в Казани. Отвечай ТОЛЬКО валидным JSON объектом без пояснений и markdown:
+- "name" - название маршрута
+- "description" - подробное описание маршрута (2-3 предложения)
+- "attractions" - массив из 4-8 мест в логичном порядке посещения; у каждого "name" (точное название), "order" (с 1), "visit_duration" (минуты), "latitude" (от 55.7 до 55.9), "longitude" (от 48.9 до 49.2), опционально "description" (1-2 предложения) и "address".
+Места можно брать из списка пользователя или добавлять известные места Казани. Координаты обязательны для каждого места."""
+
+# Times of day and the place types (with prompt labels) that fit each
+TIME_SLOTS = {
+    'Утро (9-12)': [('attractions', 'достопримечательности'), ('museums', 'музеи'), ('parks', 'парки')],
+    'Обед (12-14)': [('restaurants', 'рестораны'), ('cafes', 'кафе')],
+    'День (14-18)': [
+        ('attractions', 'достопримечательности'), ('museums', 'музеи'),
+        ('parks', 'парки'), ('shopping', 'магазины'),
+    ],
+    'Вечер (18-22)': [('bars', 'бары'), ('restaurants', 'рестораны'), ('entertainment', 'развлечения')],
+}
+
+TIME_SLOTS_INSTRUCTION = (
+    "ВАЖНО: Маршрут должен включать разные типы мест, соответствующие теме маршрута. "
+    "Распредели места по маршруту логично по времени дня:\n{slots}\n\n"
+    "Создай сбалансированный маршрут, который включает соответствующие типы мест в логичной последовательности."
+)
+
+# Structured output schema for route replies, so the first answer always
+# carries a parseable attractions array
+ROUTE_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'},
+        'description': {'type': 'string'},
+        'attractions': {
+            'type': 'array',
+            'minItems': 4,
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string'},
+                    'order': {'type': 'integer'},
+                    'visit_duration': {'type': 'integer'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'},
+                    'description': {'type': 'string'},
+                    'address': {'type': 'string'},
+                },
+                'required': ['name', 'order', 'visit_duration', 'latitude', 'longitude'],
+            },
+        },
+    },
+    'required': ['name', 'description', 'attractions'],
+}
+
+ATTRACTION_INDEX_TIMEOUT = 600
+LLM_RESPONSE_CACHE_TIMEOUT = 3600
+# WRatio score (0-100) an LLM-provided name needs to reuse an existing attraction
+FUZZY_MATCH_CUTOFF = 85
+BUDGET_STEP = 500  # rubles; budgets within one step share a cached reply
+EARTH_RADIUS_KM = 6371
+
+
+def path_distance(lats: List[float], lons: List[float]) -> float:
+    """Total Haversine length in km of the path through consecutive points."""
+    if len(lats) < 2:
+        return 0.0
+
+    lat_r = np.radians(np.asarray(lats, dtype=np.float64))
+    lon_r = np.radians(np.asarray(lons, dtype=np.float64))
+    # One cosine per point, shared by the legs on either side of it
+    cos_lat = np.cos(lat_r)
+    dlat = np.diff(lat_r)
+    dlon = np.diff(lon_r)
+
+    a = (np.sin(dlat / 2) ** 2 +
+         cos_lat[:-1] * cos_lat[1:] *
+         np.sin(dlon / 2) ** 2)
+    return float((2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).sum())
+
+
+def distance_matrix(lats: List[float], lons: List[float]) -> np.ndarray:
+    """Haversine distances in km between every pair of points."""
+    lat_r = np.radians(np.asarray(lats, dtype=np.float64))
+    lon_r = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat_r)
+    dlat = lat_r[:, None] - lat_r[None, :]
+    dlon = lon_r[:, None] - lon_r[None, :]
+
+    a = (np.sin(dlat / 2) ** 2 +
+         cos_lat[:, None] * cos_lat[None, :] *
+         np.sin(dlon / 2) ** 2)
+    # Rounding can push a hair above 1 for near-antipodal points
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearest_neighbour_order(lats: List[float], lons: List[float]) -> List[int]:
+    """Indices of the points visited from the first one, always moving to the closest unvisited point."""
+    distances = distance_matrix(lats, lons)
+    unvisited = np.ones(len(distances), dtype=bool)
+    order = [0]
+    unvisited[0] = False
+    for _ in range(len(distances) - 1):
+        nearest = int(np.argmin(np.where(unvisited, distances[order[-1]], np.inf)))
+        order.append(nearest)
+        unvisited[nearest] = False
+    return order
+
+
+def _load_attraction_index():
+    """Lowercased name -> attraction row and name word -> rows, cached until attractions change."""
+    cache_key = f'routes:attraction_index:{get_attraction_cache_version()}'
+    index = cache.get(cache_key)
+    if index is not None:
+        return index
+
+    attractions_map = {}
+    attractions_by_keyword = {}
+    # Plain rows: only what matching, ordering and distance need
+    for att in Attraction.objects.filter(is_active=True).values(
+        'id', 'name', 'latitude', 'longitude', 'visit_duration'
+    ):
+        # Exact name match (lowercase)
+        attractions_map[att['name'].lower()] = att
+
+        # Also index by keywords from name
+        for word in att['name'].lower().split():
+            if len(word) > 3:  # Only index meaningful words
+                attractions_by_keyword.setdefault(word, []).append(att)
+
+    index = (attractions_map, attractions_by_keyword)
+    cache.set(cache_key, index, ATTRACTION_INDEX_TIMEOUT)
+    return index
+
+
+def _load_prompt_attractions(category_ids) -> str:
+    """Attraction lines for the LLM prompt, cached per category filter until attractions or categories change."""
+    cache_key = 'routes:prompt_attractions:{}:{}:{}'.format(
+        get_attraction_cache_version(), get_category_cache_version(),
+        ','.join(map(str, category_ids or [])),
+    )
+    attractions_list = cache.get(cache_key)
+    if attractions_list is not None:
+        return attractions_list
+
+    attractions = Attraction.objects.filter(is_active=True)
+    if category_ids:
+        attractions = attractions.filter(category_id__in=category_ids)
+
+    # Prompt lines are formatted by Postgres; only the first 100
+    # characters of the description are read
+    prompt_lines = attractions.annotate(
+        prompt_line=Concat(
+            Value('- '), 'name',
+            Value(' ('), Coalesce('category__name', Value('Без категории')),
+            Value(') - '), Coalesce(NullIf('short_description', Value('')), Substr('description', 1, 100)),
+            output_field=CharField(),
+        )
+    ).values_list('prompt_line', flat=True)[:50]  # Limit to avoid token limits
+    attractions_list = "\n".join(prompt_lines)
+    cache.set(cache_key, attractions_list, ATTRACTION_INDEX_TIMEOUT)
+    return attractions_list
+
+
+def _default_category_id() -> Optional[int]:
+    """Category for attractions the LLM adds, cached until categories change."""
+    return cache.get_or_set(
+        f'routes:default_category:{get_category_cache_version()}',
+        lambda: Category.objects.values_list('id', flat=True).first(),
+        timeout=None,
+    )
+
+
+def _as_list(value) -> list:
+    """A single value (including a string) as a one-item list; lists, tuples and sets as lists."""
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def normalize_preferences(user_preferences: Dict) -> Dict:
+    """Canonical route preferences, so near-identical requests build the same prompt."""
+    preferences = dict(user_preferences)
+    if preferences.get('interests'):
+        preferences['interests'] = sorted({str(interest) for interest in _as_list(preferences['interests'])})
+    if preferences.get('category_ids'):
+        category_ids = set()
+        for category_id in _as_list(preferences['category_ids']):
+            try:
+                category_ids.add(int(category_id))
+            except (TypeError, ValueError):
+                continue  # not an id: it could never match a category
+        preferences['category_ids'] = sorted(category_ids)
+    for key in ('route_name', 'route_description'):
+        if preferences.get(key):
+            preferences[key] = ' '.join(preferences[key].split())
+    return preferences
+
+
+def budget_bucket(max_budget):
+    """Budget rounded down to BUDGET_STEP for cache keys; small or non-numeric budgets are kept as given."""
+    try:
+        budget = float(max_budget or 0)
+    except (TypeError, ValueError):
+        return max_budget
+    if not math.isfinite(budget) or budget < BUDGET_STEP:
+        return max_budget
+    return math.floor(budget / BUDGET_STEP) * BUDGET_STEP
+
 
 class LLMRouteGenerator:
     """Generate routes using Perplexity LLM."""
@@ -32,68 +283,31 @@ class LLMRouteGenerator:
         if not self.api_key:
             logger.warning("Perplexity API key not set. LLM generation will not work.")
     
-    def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two points using Haversine formula."""
-        R = 6371  # Earth radius in km
-        
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(dlat / 2) ** 2 +
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlon / 2) ** 2)
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return R * c
-    
     def _detect_place_types_from_text(self, text: str) -> List[str]:
         """Detect place types from route name or description."""
         if not text:
             return ['attractions']
         
-        text_lower = text.lower()
-        detected_types = []
-        
-        # Keywords mapping
-        keywords_map = {
-            'attractions': ['достопримечательность', 'памятник', 'архитектур', 'исторический', 'культурный', 'экскурсия', 'обзор'],
-            'restaurants': ['ресторан', 'рестораны', 'еда', 'кухня', 'гастроном', 'обед', 'ужин', 'трапеза'],
-            'bars': ['бар', 'бары', 'паб', 'пабы', 'пивной', 'коктейль', 'напиток', 'алкоголь'],
-            'cafes': ['кафе', 'кофе', 'кофейня', 'завтрак', 'перекус', 'десерт'],
-            'museums': ['музей', 'музеи', 'экспозиция', 'выставка', 'коллекция', 'галерея'],
-            'parks': ['парк', 'парки', 'сквер', 'скверы', 'природа', 'набережная', 'прогулка'],
-            'entertainment': ['развлечение', 'развлечения', 'клуб', 'клубы', 'кинотеатр', 'театр', 'концерт'],
-            'shopping': ['магазин', 'магазины', 'торговый', 'шоппинг', 'покупка', 'сувенир'],
-            'hotels': ['отель', 'отели', 'гостиница', 'размещение', 'ночлег']
-        }
-        
-        # Check for each type
-        for place_type, keywords in keywords_map.items():
-            if any(keyword in text_lower for keyword in keywords):
-                detected_types.append(place_type)
-        
+        seen = set()
+        for match in PLACE_TYPE_RE.finditer(text.lower()):
+            seen.add(PLACE_TYPE_BY_KEYWORD[match.group(1)])
+            if len(seen) == len(PLACE_TYPE_KEYWORDS):
+                break  # every type found, the rest of the text can't add any
+        detected_types = [place_type for place_type in PLACE_TYPE_KEYWORDS if place_type in seen]
+
         # If nothing detected, default to attractions
         return detected_types if detected_types else ['attractions']
     
-    def generate_route(self, user_preferences: Dict, duration_hours: int = 4) -> Dict:
-        """Generate route using Perplexity LLM."""
+    def generate_route(self, user_preferences: Dict, duration_hours: int = 4, ignore_cache: bool = False) -> Dict:
+        """Generate route using Perplexity LLM; identical prompts reuse a cached reply unless ignore_cache."""
         if not self.api_key:
             raise ValueError("Perplexity API key is not configured")
         
+        user_preferences = normalize_preferences(user_preferences)
+        
         try:
-            from perplexity import Perplexity
-            import re
-            
             # Get available attractions
-            attractions = Attraction.objects.filter(is_active=True)
-            if user_preferences.get('category_ids'):
-                attractions = attractions.filter(category_id__in=user_preferences['category_ids'])
-            
-            # Build prompt
-            attractions_list = "\n".join([
-                f"- {att.name} ({att.category.name if att.category else 'Без категории'}) - {att.short_description or att.description[:100]}"
-                for att in attractions[:50]  # Limit to avoid token limits
-            ])
+            attractions_list = _load_prompt_attractions(user_preferences.get('category_ids'))
             
             # Get route name and description from preferences
             route_name = user_preferences.get('route_name', None)
@@ -114,196 +328,94 @@ class LLMRouteGenerator:
                 else:
                     place_types = ['attractions']
             
-            # Build base prompt
-            base_prompt = f"""Создай туристический маршрут по Казани на {duration_hours} часов."""
-            
-            # Add route name if provided
-            if route_name:
-                base_prompt += f"\n\nНазвание маршрута (используй это название или похожее): {route_name}"
-            
-            # Add route description if provided
-            if route_description:
-                base_prompt += f"\n\nОписание маршрута от пользователя: {route_description}"
-            
-            # Add user preferences
-            base_prompt += f"""
-
-Интересы пользователя: {', '.join(user_preferences.get('interests', [])) if user_preferences.get('interests') else 'не указаны'}
-Бюджет: {user_preferences.get('max_budget', 0)} рублей"""
-            
-            # Map place types to Russian descriptions
-            place_types_map = {
-                'attractions': 'достопримечательности (памятники, архитектурные объекты, исторические места)',
-                'restaurants': 'рестораны (места для обеда и ужина)',
-                'bars': 'бары и пабы (места для вечерних напитков)',
-                'cafes': 'кафе (места для легких перекусов и кофе)',
-                'museums': 'музеи (культурные и исторические экспозиции)',
-                'parks': 'парки и скверы (природные зоны для прогулок)',
-                'entertainment': 'развлекательные заведения (клубы, кинотеатры, развлечения)',
-                'shopping': 'магазины и торговые центры',
-                'hotels': 'отели и места размещения'
-            }
-            
             # Build instruction about route theme and place types
             theme_instruction = ""
             
             # Check if multiple place types are detected or requested
             if len(place_types) > 1 or (len(place_types) == 1 and place_types[0] != 'attractions'):
                 # Build time distribution based on selected place types (without explicitly listing types)
+                selected = set(place_types)
                 time_distribution = []
-                
-                # Morning (9-12)
-                morning_types = []
-                if 'attractions' in place_types:
-                    morning_types.append('достопримечательности')
-                if 'museums' in place_types:
-                    morning_types.append('музеи')
-                if 'parks' in place_types:
-                    morning_types.append('парки')
-                if morning_types:
-                    time_distribution.append(f"- Утро (9-12): {', '.join(morning_types)}")
-                
-                # Lunch (12-14)
-                lunch_types = []
-                if 'restaurants' in place_types:
-                    lunch_types.append('рестораны')
-                if 'cafes' in place_types:
-                    lunch_types.append('кафе')
-                if lunch_types:
-                    time_distribution.append(f"- Обед (12-14): {', '.join(lunch_types)}")
-                
-                # Afternoon (14-18)
-                afternoon_types = []
-                if 'attractions' in place_types:
-                    afternoon_types.append('достопримечательности')
-                if 'museums' in place_types:
-                    afternoon_types.append('музеи')
-                if 'parks' in place_types:
-                    afternoon_types.append('парки')
-                if 'shopping' in place_types:
-                    afternoon_types.append('магазины')
-                if afternoon_types:
-                    time_distribution.append(f"- День (14-18): {', '.join(afternoon_types)}")
-                
-                # Evening (18-22)
-                evening_types = []
-                if 'bars' in place_types:
-                    evening_types.append('бары')
-                if 'restaurants' in place_types:
-                    evening_types.append('рестораны')
-                if 'entertainment' in place_types:
-                    evening_types.append('развлечения')
-                if evening_types:
-                    time_distribution.append(f"- Вечер (18-22): {', '.join(evening_types)}")
+                for slot, slot_types in TIME_SLOTS.items():
+                    labels = [label for place_type, label in slot_types if place_type in selected]
+                    if labels:
+                        time_distribution.append(f"- {slot}: {', '.join(labels)}")
                 
                 if time_distribution:
-                    theme_instruction = "\n\nВАЖНО: Маршрут должен включать разные типы мест, соответствующие теме маршрута. Распредели места по маршруту логично по времени дня:\n"
-                    theme_instruction += "\n".join(time_distribution)
-                    theme_instruction += "\n\nСоздай сбалансированный маршрут, который включает соответствующие типы мест в логичной последовательности."
+                    theme_instruction = TIME_SLOTS_INSTRUCTION.format(slots="\n".join(time_distribution))
             
             # If only attractions, add general instruction based on route name
             elif route_name:
-                route_name_lower = route_name.lower()
-                if any(word in route_name_lower for word in ['бар', 'бары', 'клуб', 'клубы', 'развлечения', 'ночная']):
-                    theme_instruction = "\n\nВАЖНО: Маршрут должен быть посвящен барам, клубам и ночным развлечениям Казани. Выбери бары, пабы, клубы и развлекательные заведения."
-                elif any(word in route_name_lower for word in ['еда', 'ресторан', 'кафе', 'кухня', 'гастроном']):
-                    theme_instruction = "\n\nВАЖНО: Маршрут должен быть посвящен гастрономии Казани. Выбери рестораны, кафе и места с местной кухней."
-                elif any(word in route_name_lower for word in ['история', 'исторический', 'музей', 'памятник']):
-                    theme_instruction = "\n\nВАЖНО: Маршрут должен быть посвящен истории и культуре Казани. Выбери исторические достопримечательности и музеи."
-                elif any(word in route_name_lower for word in ['природа', 'парк', 'сквер', 'набережная']):
-                    theme_instruction = "\n\nВАЖНО: Маршрут должен быть посвящен природе и паркам Казани. Выбери парки, скверы и природные достопримечательности."
+                themes = {THEME_BY_KEYWORD[m.group(1)] for m in THEME_RE.finditer(route_name.lower())}
+                if themes:
+                    theme_instruction = ROUTE_THEMES[min(themes)][1]
             
-            prompt = f"""{base_prompt}{theme_instruction}
-
-Доступные достопримечательности:
-{attractions_list}
-
-ВАЖНО: Ты ДОЛЖЕН вернуть ответ ТОЛЬКО в формате JSON без дополнительного текста. JSON должен содержать:
-1. "name" - название маршрута
-2. "description" - подробное описание маршрута (2-3 предложения)
-3. "attractions" - МАССИВ объектов, где каждый объект содержит:
-   - "name" - точное название достопримечательности
-   - "order" - порядковый номер посещения (начиная с 1)
-   - "visit_duration" - время посещения в минутах
-   - "latitude" - широта координат достопримечательности в Казани (обязательно, число от 55.7 до 55.9)
-   - "longitude" - долгота координат достопримечательности в Казани (обязательно, число от 48.9 до 49.2)
-   - "description" - краткое описание достопримечательности (1-2 предложения, опционально)
-   - "address" - адрес достопримечательности в Казани (опционально)
-
-Выбери 4-8 мест (можно использовать из списка выше или добавить известные места Казани) и расположи их в логичном порядке. 
-
-Если маршрут должен комбинировать разные типы мест (достопримечательности + рестораны + бары и т.д.), распредели их по времени дня логично:
-- Утро (9-12): достопримечательности, музеи, парки
-- Обед (12-14): рестораны, кафе
-- День (14-18): достопримечательности, музеи, прогулки
-- Вечер (18-22): бары, рестораны, развлечения
-
-ОБЯЗАТЕЛЬНО укажи координаты для каждого места.
-
-Пример правильного ответа:
-{{
-    "name": "Маршрут по центру Казани",
-    "description": "Описание маршрута...",
-    "attractions": [
-        {{
-            "name": "Казанский Кремль",
-            "order": 1,
-            "visit_duration": 90,
-            "latitude": 55.7981,
-            "longitude": 49.1063,
-            "description": "Историческая крепость, объект Всемирного наследия ЮНЕСКО",
-            "address": "Кремль, Казань"
-        }},
-        {{
-            "name": "Улица Баумана",
-            "order": 2,
-            "visit_duration": 60,
-            "latitude": 55.7947,
-            "longitude": 49.1054,
-            "description": "Главная пешеходная улица Казани",
-            "address": "ул. Баумана, Казань"
-        }}
-    ]
-}}"""
+            # Only the dynamic parts go into the user message
+            interests = user_preferences.get('interests')
+            prompt_parts = [f"Создай туристический маршрут по Казани на {duration_hours} часов."]
+            if route_name:
+                prompt_parts.append(f"Название маршрута (используй это название или похожее): {route_name}")
+            if route_description:
+                prompt_parts.append(f"Описание маршрута от пользователя: {route_description}")
+            interests_line = f"Интересы пользователя: {', '.join(interests) if interests else 'не указаны'}"
+            max_budget = user_preferences.get('max_budget', 0)
+            prompt_parts.append(f"{interests_line}\nБюджет: {max_budget} рублей")
+            budget_part = len(prompt_parts) - 1
+            if theme_instruction:
+                prompt_parts.append(theme_instruction)
+            prompt_parts.append(f"Доступные достопримечательности:\n{attractions_list}")
+            user_message = "\n\n".join(prompt_parts)
             
-            # Use official Perplexity Python SDK
-            # Make the prompt more explicit about JSON format requirement
-            user_message = f"""Ты помощник по планированию туристических маршрутов в Казани.
-
-{prompt}
-
-КРИТИЧЕСКИ ВАЖНО: Твой ответ должен быть ТОЛЬКО валидным JSON объектом без дополнительного текста, комментариев или markdown разметки. Начни ответ сразу с открывающей фигурной скобки {{ и закончи закрывающей }}. Массив "attractions" ОБЯЗАТЕЛЕН и должен содержать минимум 4 элемента."""
+            # Budgets within one step share a reply; the prompt keeps the user's own figure
+            prompt_parts[budget_part] = f"{interests_line}\nБюджет: {budget_bucket(max_budget)} рублей"
+            cache_key = 'routes:llm:{}:{}'.format(
+                hashlib.blake2b("\n\n".join(prompt_parts).encode(), digest_size=16).hexdigest(), self.model
+            )
+            if not ignore_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Using cached Perplexity response")
+                    return cached
             
-            # Initialize Perplexity client
-            client = Perplexity(api_key=self.api_key)
+            client = get_perplexity_client(self.api_key)
             
             # Call Perplexity API using official SDK
             response = client.chat.completions.create(
                 model=self.model,
                 messages=[
+                    {"role": "system", "content": ROUTE_SYSTEM_PROMPT},
                     {"role": "user", "content": user_message}
                 ],
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                response_format={
+                    'type': 'json_schema',
+                    'json_schema': {'schema': ROUTE_RESPONSE_SCHEMA},
+                }
             )
             
             # Extract content from response
             content = response.choices[0].message.content
             
             # Extract JSON from response (might be wrapped in markdown)
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                route_data = json.loads(json_match.group())
-            else:
-                # Fallback: try to parse entire content
-                route_data = json.loads(content)
+            route_data = parse_json_object(content)
+            if route_data is None:
+                raise ValueError("Perplexity response contains no JSON object")
             
             # Validate that attractions array exists
             if 'attractions' not in route_data or not isinstance(route_data.get('attractions'), list):
-                logger.warning(f"Perplexity response missing attractions array. Full response: {json.dumps(route_data, ensure_ascii=False, indent=2)}")
+                logger.warning("Perplexity response missing attractions array. Full response: %s", route_data)
                 route_data['attractions'] = []
             else:
-                logger.info(f"Perplexity returned {len(route_data.get('attractions', []))} attractions: {[a.get('name') for a in route_data.get('attractions', [])]}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "Perplexity returned %d attractions: %s",
+                        len(route_data['attractions']),
+                        [a.get('name') for a in route_data['attractions']]
+                    )
+                # Only complete routes are worth replaying
+                if len(route_data['attractions']) >= 4:
+                    cache.set(cache_key, route_data, LLM_RESPONSE_CACHE_TIMEOUT)
             
             return route_data
         
@@ -313,57 +425,36 @@ class LLMRouteGenerator:
     
     def create_route_from_llm_response(self, user, llm_response: Dict, duration_hours: int) -> Route:
         """Create Route object from LLM response."""
-        # Map attraction names to actual Attraction objects
-        # Create multiple mappings for better matching
-        attractions_map = {}
-        attractions_by_keyword = {}
+        # Name and keyword indexes of active attractions for matching
+        attractions_map, attractions_by_keyword = _load_attraction_index()
+        fuzzy_choices = list(attractions_map)
         
-        for att in Attraction.objects.filter(is_active=True):
-            # Exact name match (lowercase)
-            attractions_map[att.name.lower()] = att
-            
-            # Also index by keywords from name
-            name_words = att.name.lower().split()
-            for word in name_words:
-                if len(word) > 3:  # Only index meaningful words
-                    if word not in attractions_by_keyword:
-                        attractions_by_keyword[word] = []
-                    attractions_by_keyword[word].append(att)
-        
-        route = Route.objects.create(
-            user=user,
-            name=llm_response.get('name', 'Сгенерированный маршрут'),
-            description=llm_response.get('description', ''),
-            duration_hours=duration_hours,
-            budget=Decimal('0.0'),
-            distance_km=Decimal('0.0'),
-            is_public=False
-        )
-        
-        # Add attractions
-        total_distance = 0.0
-        prev_lat = None
-        prev_lon = None
+        # Resolve attractions first; the route is written once they are known
+        lats = []
+        lons = []
+        route_attractions = []
         matched_attractions = []
         unmatched_names = []
         created_count = 0
         
         attractions_list = llm_response.get('attractions', [])
         
-        # If no attractions in response, try to extract from description using LLM
+        # If no attractions in response, optionally try to extract them from the
+        # description with a second LLM call. Replies are schema-constrained, so
+        # this is off by default: it doubles latency on the unhappy path.
         if not attractions_list:
-            logger.warning("No attractions array in LLM response, attempting to extract from description")
+            logger.warning("No attractions array in LLM response")
             description = llm_response.get('description', '')
             api_key = getattr(settings, 'PERPLEXITY_API_KEY', None)
-            if description and api_key:
+            if description and api_key and settings.PERPLEXITY_EXTRACT_FALLBACK:
+                logger.info("Attempting to extract attractions from description")
                 try:
                     # Try to extract attraction names from description using a second LLM call
-                    from perplexity import Perplexity
                     model = getattr(settings, 'PERPLEXITY_MODEL', 'sonar-pro')
                     
                     # Get available attractions for matching
-                    available_attractions = Attraction.objects.filter(is_active=True)[:30]
-                    attractions_names_list = "\n".join([f"- {att.name}" for att in available_attractions])
+                    available_names = Attraction.objects.filter(is_active=True).values_list('name', flat=True)[:30]
+                    attractions_names_list = "\n".join([f"- {name}" for name in available_names])
                     
                     extract_prompt = f"""Из следующего описания маршрута извлеки названия достопримечательностей с координатами и верни ТОЛЬКО JSON массив с объектами:
 
@@ -390,7 +481,7 @@ class LLMRouteGenerator:
 
 ОБЯЗАТЕЛЬНО укажи координаты (latitude, longitude) для каждой достопримечательности. Координаты Казани: широта от 55.7 до 55.9, долгота от 48.9 до 49.2."""
                     
-                    client = Perplexity(api_key=api_key)
+                    client = get_perplexity_client(api_key)
                     extract_response = client.chat.completions.create(
                         model=model,
                         messages=[{"role": "user", "content": extract_prompt}],
@@ -399,9 +490,8 @@ class LLMRouteGenerator:
                     )
                     
                     extract_content = extract_response.choices[0].message.content
-                    json_match = re.search(r'\{.*\}', extract_content, re.DOTALL)
-                    if json_match:
-                        extract_data = json.loads(json_match.group())
+                    extract_data = parse_json_object(extract_content)
+                    if extract_data:
                         attractions_list = extract_data.get('attractions', [])
                         logger.info(f"Extracted {len(attractions_list)} attractions from description")
                 except Exception as e:
@@ -417,26 +507,12 @@ class LLMRouteGenerator:
             
             # Try fuzzy matching if exact match failed
             if not attraction:
-                # Try substring matching (more lenient)
-                best_match = None
-                best_score = 0
-                
-                for key, att in attractions_map.items():
-                    # Calculate similarity score
-                    score = 0
-                    # Exact substring match gets high score
-                    if att_name_lower in key:
-                        score = len(att_name_lower) / len(key)
-                    elif key in att_name_lower:
-                        score = len(key) / len(att_name_lower)
-                    
-                    if score > best_score and score > 0.5:  # At least 50% match
-                        best_score = score
-                        best_match = att
-                
-                if best_match:
-                    attraction = best_match
-                    logger.info(f"Fuzzy matched '{att_name}' to '{attraction.name}' (score: {best_score:.2f})")
+                match = process.extractOne(
+                    att_name_lower, fuzzy_choices, scorer=fuzz.WRatio, score_cutoff=FUZZY_MATCH_CUTOFF
+                )
+                if match:
+                    attraction = attractions_map[match[0]]
+                    logger.info(f"Fuzzy matched '{att_name}' to '{attraction['name']}' (score: {match[1]:.0f})")
                 
                 # Try keyword matching as fallback
                 if not attraction:
@@ -445,7 +521,7 @@ class LLMRouteGenerator:
                         if word in attractions_by_keyword:
                             # Use first match (could be improved with scoring)
                             attraction = attractions_by_keyword[word][0]
-                            logger.info(f"Keyword matched '{att_name}' to '{attraction.name}' via keyword '{word}'")
+                            logger.info(f"Keyword matched '{att_name}' to '{attraction['name']}' via keyword '{word}'")
                             break
             
             # If attraction not found, create it in DB using data from Perplexity
@@ -457,33 +533,39 @@ class LLMRouteGenerator:
                 if latitude and longitude:
                     try:
                         # Create new attraction in database
-                        from django.utils.text import slugify
-                        
-                        # Generate unique slug
-                        base_slug = slugify(att_name)
+                        # Generate unique slug; candidates are checked against
+                        # one fetch of the taken slugs with this prefix
+                        base_slug = slugify(att_name) or 'attraction'
+                        taken_slugs = set(
+                            Attraction.objects.filter(slug__startswith=base_slug).values_list('slug', flat=True)
+                        )
                         slug = base_slug
                         counter = 1
-                        while Attraction.objects.filter(slug=slug).exists():
+                        while slug in taken_slugs:
                             slug = f"{base_slug}-{counter}"
                             counter += 1
                         
-                        # Get or create default category (or use first available)
-                        default_category = Category.objects.first()
-                        
                         # Create attraction
-                        attraction = Attraction.objects.create(
+                        created = Attraction.objects.create(
                             name=att_name,
                             slug=slug,
                             description=att_data.get('description', f'Достопримечательность {att_name} в Казани'),
                             short_description=att_data.get('description', '')[:200] if att_data.get('description') else None,
-                            latitude=Decimal(str(latitude)),
-                            longitude=Decimal(str(longitude)),
+                            latitude=float(latitude),
+                            longitude=float(longitude),
                             address=att_data.get('address', ''),
-                            category=default_category,
+                            category_id=_default_category_id(),
                             visit_duration=att_data.get('visit_duration', 60),
                             is_free=True,  # Assume free by default
                             is_active=True
                         )
+                        attraction = {
+                            'id': created.id,
+                            'name': created.name,
+                            'latitude': created.latitude,
+                            'longitude': created.longitude,
+                            'visit_duration': created.visit_duration,
+                        }
                         
                         logger.info(f"Created new attraction in DB: {att_name} at ({latitude}, {longitude})")
                         created_count += 1
@@ -500,28 +582,34 @@ class LLMRouteGenerator:
             if attraction:
                 # Use order from LLM response or use position in list
                 order = att_data.get('order', idx)
-                visit_duration = att_data.get('visit_duration', attraction.visit_duration or 60)
+                visit_duration = att_data.get('visit_duration', attraction['visit_duration'] or 60)
                 
-                RouteAttraction.objects.create(
-                    route=route,
-                    attraction=attraction,
+                route_attractions.append(RouteAttraction(
+                    attraction_id=attraction['id'],
                     order=order,
                     visit_duration=visit_duration,
-                    notes=att_name if att_name != attraction.name else None
-                )
+                    notes=att_name if att_name != attraction['name'] else None
+                ))
                 
                 matched_attractions.append(att_name)
-                
-                # Calculate distance
-                if prev_lat and prev_lon:
-                    distance = self._calculate_distance(
-                        prev_lat, prev_lon,
-                        float(attraction.latitude), float(attraction.longitude)
-                    )
-                    total_distance += distance
-                
-                prev_lat = float(attraction.latitude)
-                prev_lon = float(attraction.longitude)
+                lats.append(attraction['latitude'])
+                lons.append(attraction['longitude'])
+        
+        # Route and its stops in one transaction, with the final distance in
+        # the INSERT instead of a follow-up UPDATE
+        with transaction.atomic():
+            route = Route.objects.create(
+                user=user,
+                name=llm_response.get('name', 'Сгенерированный маршрут'),
+                description=llm_response.get('description', ''),
+                duration_hours=duration_hours,
+                budget=Decimal('0.0'),
+                distance_km=Decimal(str(path_distance(lats, lons))),
+                is_public=False
+            )
+            for route_attraction in route_attractions:
+                route_attraction.route = route
+            RouteAttraction.objects.bulk_create(route_attractions, batch_size=100)
         
         # Log matching results
         if matched_attractions:
@@ -529,9 +617,6 @@ class LLMRouteGenerator:
         if unmatched_names:
             logger.warning(f"Failed to match {len(unmatched_names)} attractions: {unmatched_names}")
         
-        route.distance_km = Decimal(str(total_distance))
-        route.save()
-        
         return route
 
 
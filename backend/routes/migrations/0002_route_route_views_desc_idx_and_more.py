@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-15 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-views_count'], name='route_views_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routeattraction',
+            index=models.Index(fields=['attraction', 'route'], name='ra_attr_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routeattraction',
+            index=models.Index(fields=['route', 'attraction'], name='ra_route_attr_idx'),
+        ),
+    ]
@@ -47,6 +47,7 @@ class Route(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['is_public']),
             models.Index(fields=['-views_count']),
+            models.Index(fields=['-views_count'], name='route_views_desc_idx', condition=models.Q(is_public=True)),
         ]
 
     def __str__(self):
@@ -72,6 +73,8 @@ class RouteAttraction(models.Model):
         ordering = ['route', 'order']
         indexes = [
             models.Index(fields=['route', 'order']),
+            models.Index(fields=['attraction', 'route'], name='ra_attr_route_idx'),
+            models.Index(fields=['route', 'attraction'], name='ra_route_attr_idx'),
         ]
 
     def __str__(self):
@@ -38,6 +38,20 @@ class RouteSerializer(serializers.ModelSerializer):
         return obj.route_attractions.count()
 
 
+def _build_route_attractions(route, attractions_data):
+    """Build unsaved RouteAttraction rows for a single bulk insert."""
+    return [
+        RouteAttraction(
+            route=route,
+            attraction_id=att_data.get('attraction_id'),
+            order=att_data.get('order', 1),
+            visit_duration=att_data.get('visit_duration', 60),
+            notes=att_data.get('notes', '')
+        )
+        for att_data in attractions_data
+    ]
+
+
 class RouteCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating routes with attractions."""
     attractions = serializers.ListField(
@@ -58,14 +72,9 @@ class RouteCreateSerializer(serializers.ModelSerializer):
         attractions_data = validated_data.pop('attractions', [])
         route = Route.objects.create(user=self.context['request'].user, **validated_data)
         
-        for att_data in attractions_data:
-            RouteAttraction.objects.create(
-                route=route,
-                attraction_id=att_data.get('attraction_id'),
-                order=att_data.get('order', 1),
-                visit_duration=att_data.get('visit_duration', 60),
-                notes=att_data.get('notes', '')
-            )
+        RouteAttraction.objects.bulk_create(
+            _build_route_attractions(route, attractions_data), batch_size=100
+        )
         
         return route
 
@@ -80,14 +89,9 @@ class RouteCreateSerializer(serializers.ModelSerializer):
             # Delete existing attractions
             instance.route_attractions.all().delete()
             # Create new ones
-            for att_data in attractions_data:
-                RouteAttraction.objects.create(
-                    route=instance,
-                    attraction_id=att_data.get('attraction_id'),
-                    order=att_data.get('order', 1),
-                    visit_duration=att_data.get('visit_duration', 60),
-                    notes=att_data.get('notes', '')
-                )
+            RouteAttraction.objects.bulk_create(
+                _build_route_attractions(instance, attractions_data), batch_size=100
+            )
         
         return instance
 
@@ -1,9 +1,18 @@
 from django.test import TestCase
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from attractions.models import Category, Attraction
+from .generators import (
+    LLMRouteGenerator, _load_attraction_index, _load_prompt_attractions, budget_bucket,
+    nearest_neighbour_order, normalize_preferences, path_distance,
+)
 from .models import Route, RouteAttraction, UserPreference
 
 User = get_user_model()
@@ -123,6 +132,77 @@ class RouteAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['name'], data['name'])
 
+    def test_update_route_attractions_bulk_inserted(self):
+        """Test replacing route attractions costs the same queries for any count."""
+        route = Route.objects.create(name='Маршрут', description='Описание', user=self.user, duration_hours=2)
+        attractions = [self.attraction] + [
+            Attraction.objects.create(
+                name=f'Место {i}', slug=f'place-{i}', description='Описание',
+                latitude=55.79, longitude=49.1, category=self.category,
+            )
+            for i in range(2)
+        ]
+
+        query_counts = []
+        for count in (1, 3):
+            data = {'attractions': [
+                {'attraction_id': attraction.id, 'order': order}
+                for order, attraction in enumerate(attractions[:count], 1)
+            ]}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(f'/api/routes/{route.id}/', data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(route.route_attractions.count(), count)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def _create_route_with_stops(self, longitudes, orders=None):
+        route = Route.objects.create(name='Маршрут', description='Описание', user=self.user, duration_hours=2)
+        for i, longitude in enumerate(longitudes):
+            attraction = Attraction.objects.create(
+                name=f'Место {i + 1}', slug=f'place-{route.id}-{i + 1}', description='Описание',
+                latitude=55.79, longitude=longitude, category=self.category,
+            )
+            RouteAttraction.objects.create(route=route, attraction=attraction, order=orders[i] if orders else i + 1)
+        return route
+
+    def test_optimize_route(self):
+        """Test optimize reorders stops by nearest neighbour and updates the distance."""
+        # Stored out of order: start, far, near, middle
+        route = self._create_route_with_stops([49.10, 49.13, 49.11, 49.12])
+
+        response = self.client.post(f'/api/routes/{route.id}/optimize/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(route.route_attractions.order_by('order').values_list('attraction__name', flat=True)),
+            ['Место 1', 'Место 3', 'Место 4', 'Место 2'],
+        )
+        self.assertEqual(list(route.route_attractions.order_by('order').values_list('order', flat=True)), [1, 2, 3, 4])
+        route.refresh_from_db()
+        self.assertAlmostEqual(float(route.distance_km), 1.876, places=2)
+
+    def test_optimize_route_queries_constant(self):
+        """Test the new order is written in the same number of queries for any route length."""
+        query_counts = []
+        # The longer route has gaps in its stored orders
+        cases = (
+            ([49.10, 49.12, 49.11], None),
+            ([49.10, 49.15, 49.11, 49.14, 49.12, 49.13], [2, 4, 5, 7, 9, 12]),
+        )
+        for longitudes, orders in cases:
+            route = self._create_route_with_stops(longitudes, orders)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(f'/api/routes/{route.id}/optimize/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # The response serializer reads per stop; count the writes
+            query_counts.append(sum(q['sql'].startswith('UPDATE') for q in queries.captured_queries))
+            self.assertEqual(
+                list(route.route_attractions.order_by('order').values_list('order', flat=True)),
+                list(range(1, len(longitudes) + 1)),
+            )
+        # order shift, bulk order update, route save
+        self.assertEqual(query_counts, [3, 3])
+
     def test_list_routes(self):
         """Test listing user routes."""
         Route.objects.create(
@@ -148,4 +228,280 @@ class RouteAPITest(TestCase):
         self.assertEqual(response.data['name'], route.name)
 
 
+class LLMRouteGeneratorTest(TestCase):
+    """Tests for LLMRouteGenerator helpers."""
+
+    def setUp(self):
+        cache.clear()
+        self.generator = LLMRouteGenerator()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='История', slug='history')
+        self.kremlin = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Историческая крепость',
+            latitude=55.7981,
+            longitude=49.1063,
+            category=self.category,
+        )
+
+    def test_path_distance(self):
+        """Test path length sums the legs between consecutive points."""
+        # Kremlin -> Bauman street -> Kremlin, ~0.4 km each way
+        distance = path_distance(
+            [55.7981, 55.7947, 55.7981],
+            [49.1063, 49.1054, 49.1063],
+        )
+        self.assertAlmostEqual(distance, 0.7645, places=3)
+
+    def test_path_distance_single_point(self):
+        """Test a path with fewer than two points has zero length."""
+        self.assertEqual(path_distance([55.7981], [49.1063]), 0.0)
+
+    def test_nearest_neighbour_order(self):
+        """Test the order always moves on to the closest unvisited point."""
+        lats = [55.79, 55.79, 55.79, 55.79]
+        lons = [49.10, 49.13, 49.11, 49.12]
+        self.assertEqual(nearest_neighbour_order(lats, lons), [0, 2, 3, 1])
+        self.assertEqual(nearest_neighbour_order([55.79], [49.10]), [0])
+
+    def test_detect_place_types(self):
+        """Test place types are detected from keywords in the text."""
+        self.assertEqual(
+            self.generator._detect_place_types_from_text('Вечер: Бары и театр после ужина'),
+            ['restaurants', 'bars', 'entertainment']
+        )
+        self.assertEqual(self.generator._detect_place_types_from_text('Маршрут'), ['attractions'])
+
+    def test_create_route_from_llm_response(self):
+        """Test LLM attractions are matched or created and added in bulk."""
+        Attraction.objects.create(name='Новое место', slug='attraction', description='Описание', latitude=55.79, longitude=49.1)
+        llm_response = {
+            'name': 'Маршрут',
+            'description': 'Описание',
+            'attractions': [
+                {'name': 'Казанский кремль', 'order': 1, 'visit_duration': 90},
+                {'name': 'Улица Баумана', 'order': 2, 'latitude': 55.7947, 'longitude': 49.1054},
+            ],
+        }
+        # attractions, taken slugs, category, new attraction, then route + bulk
+        # insert inside a savepoint (the test's transaction wraps the atomic block)
+        with self.assertNumQueries(8):
+            route = self.generator.create_route_from_llm_response(self.user, llm_response, 4)
+
+        route_attractions = list(route.route_attractions.select_related('attraction'))
+        self.assertEqual([ra.attraction.name for ra in route_attractions], ['Казанский Кремль', 'Улица Баумана'])
+        self.assertEqual(route_attractions[1].attraction.slug, 'attraction-1')
+        self.assertEqual(route_attractions[1].attraction.category, self.category)
+        self.assertAlmostEqual(float(route.distance_km), 0.3822, places=3)
+
+    def test_create_route_fuzzy_match(self):
+        """Test near-identical names reuse the existing attraction."""
+        llm_response = {'attractions': [{'name': 'Казанский Кремль (крепость)', 'order': 1}]}
+        route = self.generator.create_route_from_llm_response(self.user, llm_response, 2)
+        self.assertEqual(route.route_attractions.get().attraction, self.kremlin)
+        self.assertEqual(Attraction.objects.count(), 1)
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_no_extraction_call_by_default(self):
+        """Test a reply without attractions doesn't trigger a second LLM call."""
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            route = self.generator.create_route_from_llm_response(
+                self.user, {'name': 'Маршрут', 'description': 'Кремль и Баумана'}, 2
+            )
+        get_client.assert_not_called()
+        self.assertFalse(route.route_attractions.exists())
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_generate_route_prompt(self):
+        """Test the prompt lists attractions from a single query."""
+        Attraction.objects.create(
+            name='Улица Баумана',
+            slug='bauman-street',
+            description='Пешеходная улица',
+            short_description='',
+            latitude=55.7947,
+            longitude=49.1054,
+        )
+        reply = MagicMock()
+        reply.choices[0].message.content = '{"name": "Маршрут", "description": "", "attractions": []}'
+        generator = LLMRouteGenerator()
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            get_client.return_value.chat.completions.create.return_value = reply
+            with self.assertNumQueries(1):
+                route_data = generator.generate_route({}, duration_hours=2)
+
+        prompt = get_client.return_value.chat.completions.create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('- Казанский Кремль (История) - Историческая крепость', prompt)
+        self.assertIn('- Улица Баумана (Без категории) - Пешеходная улица', prompt)
+        self.assertEqual(route_data['name'], 'Маршрут')
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_generate_route_time_slots(self):
+        """Test requested place types are spread over times of day in the prompt."""
+        reply = MagicMock()
+        reply.choices[0].message.content = '{"name": "Маршрут", "description": "", "attractions": []}'
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            get_client.return_value.chat.completions.create.return_value = reply
+            LLMRouteGenerator().generate_route({'place_types': ['bars', 'restaurants']}, duration_hours=4)
+
+        prompt = get_client.return_value.chat.completions.create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('- Обед (12-14): рестораны\n- Вечер (18-22): бары, рестораны', prompt)
+        self.assertNotIn('Утро', prompt)
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_generate_route_reply_cached(self):
+        """Test identical requests reuse a complete LLM reply unless ignore_cache is set."""
+        attractions = ', '.join(
+            f'{{"name": "Место {i}", "order": {i}, "visit_duration": 60, "latitude": 55.79, "longitude": 49.1}}'
+            for i in range(1, 5)
+        )
+        reply = MagicMock()
+        reply.choices[0].message.content = f'{{"name": "Маршрут", "description": "", "attractions": [{attractions}]}}'
+        generator = LLMRouteGenerator()
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            create = get_client.return_value.chat.completions.create
+            create.return_value = reply
+            first = generator.generate_route({'route_name': 'Вечер'}, duration_hours=2)
+            second = generator.generate_route({'route_name': 'Вечер'}, duration_hours=2)
+            self.assertEqual(create.call_count, 1)
+            self.assertEqual(first, second)
+
+            generator.generate_route({'route_name': 'Вечер'}, duration_hours=2, ignore_cache=True)
+            self.assertEqual(create.call_count, 2)
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_generate_route_similar_preferences_share_reply(self):
+        """Test requests differing only in order, spacing or budget step reuse one reply."""
+        attractions = ', '.join(
+            f'{{"name": "Место {i}", "order": {i}, "visit_duration": 60, "latitude": 55.79, "longitude": 49.1}}'
+            for i in range(1, 5)
+        )
+        reply = MagicMock()
+        reply.choices[0].message.content = f'{{"name": "Маршрут", "description": "", "attractions": [{attractions}]}}'
+        generator = LLMRouteGenerator()
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            create = get_client.return_value.chat.completions.create
+            create.return_value = reply
+            generator.generate_route(
+                {'route_name': 'Вечер  в Казани', 'interests': ['history', 'food'], 'max_budget': 1200}
+            )
+            generator.generate_route(
+                {'route_name': 'Вечер в Казани', 'interests': ['food', 'history'], 'max_budget': 1400}
+            )
+        self.assertEqual(create.call_count, 1)
+        self.assertIn('Бюджет: 1200 рублей', create.call_args.kwargs['messages'][-1]['content'])
+
+    def test_budget_bucket(self):
+        """Test cache-key budgets are rounded down and values that aren't numbers are left alone."""
+        self.assertEqual(budget_bucket(1999), 1500)
+        self.assertEqual(budget_bucket(300), 300)
+        self.assertEqual(budget_bucket('много'), 'много')
+        self.assertEqual(normalize_preferences({'max_budget': 1999})['max_budget'], 1999)
+
+    def test_normalize_preferences_lists(self):
+        """Test ids are coerced to int and a single string isn't split into characters."""
+        preferences = normalize_preferences({'category_ids': ['3', 1, 3, 'x'], 'interests': 'history'})
+        self.assertEqual(preferences['category_ids'], [1, 3])
+        self.assertEqual(preferences['interests'], ['history'])
+        self.assertEqual(normalize_preferences({'category_ids': '2'})['category_ids'], [2])
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    def test_generate_route_reply_wrapped_in_prose(self):
+        """Test the route object is read from a reply with prose and braces around it."""
+        reply = MagicMock()
+        reply.choices[0].message.content = (
+            'Вот маршрут:\n```json\n{"name": "Маршрут", "attractions": []}\n```\n'
+            'Формат ответа: {name, attractions}'
+        )
+        with patch('routes.generators.get_perplexity_client') as get_client:
+            get_client.return_value.chat.completions.create.return_value = reply
+            route_data = LLMRouteGenerator().generate_route({}, ignore_cache=True)
+        self.assertEqual(route_data, {'name': 'Маршрут', 'attractions': []})
+
+    def test_create_route_default_category_cached(self):
+        """Test the default category for new attractions is looked up once."""
+        self.generator.create_route_from_llm_response(
+            self.user, {'attractions': [{'name': 'Улица Баумана', 'order': 1}]}, 2
+        )
+        llm_response = {'attractions': [{'name': 'Театр Камала', 'order': 1, 'latitude': 55.7857, 'longitude': 49.1147}]}
+        with self.assertNumQueries(7):
+            route = self.generator.create_route_from_llm_response(self.user, llm_response, 2)
+        self.assertEqual(route.route_attractions.get().attraction.category, self.category)
+
+    def test_attraction_index_cached(self):
+        """Test the name index is served from cache until an attraction changes."""
+        _load_attraction_index()
+        with self.assertNumQueries(0):
+            attractions_map, _ = _load_attraction_index()
+        self.assertIn('казанский кремль', attractions_map)
+
+        self.kremlin.name = 'Кремль'
+        self.kremlin.save()
+        attractions_map, attractions_by_keyword = _load_attraction_index()
+        self.assertIn('кремль', attractions_map)
+        self.assertNotIn('казанский', attractions_by_keyword)
+
+    def test_prompt_attractions_cached(self):
+        """Test prompt attraction lines are cached per category filter until an attraction changes."""
+        _load_prompt_attractions([self.category.id])
+        with self.assertNumQueries(0):
+            attractions_list = _load_prompt_attractions([self.category.id])
+        self.assertIn('Казанский Кремль', attractions_list)
+        self.assertEqual(_load_prompt_attractions([self.category.id + 1]), '')
+
+        self.kremlin.name = 'Кремль'
+        self.kremlin.save()
+        self.assertNotIn('Казанский Кремль', _load_prompt_attractions([self.category.id]))
+
+
+class RouteAdminTest(TestCase):
+    """Tests for route admin changelists."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            username='admin',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin)
+        self.attraction = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Историческая крепость',
+            latitude=55.8304,
+            longitude=49.0661,
+        )
+
+    def _add_route(self, i):
+        user = User.objects.create_user(email=f'user{i}@example.com', username=f'user{i}', password='testpass123')
+        route = Route.objects.create(name=f'Маршрут {i}', user=user, duration_hours=2)
+        RouteAttraction.objects.create(route=route, attraction=self.attraction, order=1)
+        UserPreference.objects.create(user=user)
+
+    def _changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_query_count_constant(self):
+        """Test changelist queries don't grow with the number of rows."""
+        urls = ['/admin/routes/route/', '/admin/routes/routeattraction/', '/admin/routes/userpreference/']
+        self._add_route(0)
+        counts = [self._changelist_queries(url) for url in urls]
+        for i in range(1, 4):
+            self._add_route(i)
+        self.assertEqual([self._changelist_queries(url) for url in urls], counts)
 
+    def test_route_change_form_autocompletes_attractions(self):
+        """Test the route inline doesn't render every attraction as a choice."""
+        self._add_route(0)
+        route = Route.objects.get()
+        response = self.client.get(f'/admin/routes/route/{route.id}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'admin-autocomplete')
@@ -1,13 +1,14 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 from decimal import Decimal
-from .models import Route, UserPreference
+from .models import Route, RouteAttraction, UserPreference
 from .serializers import (
     RouteSerializer, RouteCreateSerializer, UserPreferenceSerializer
 )
-from .generators import LLMRouteGenerator
+from .generators import LLMRouteGenerator, nearest_neighbour_order, path_distance
 
 
 class RouteViewSet(viewsets.ModelViewSet):
@@ -78,6 +79,8 @@ class RouteViewSet(viewsets.ModelViewSet):
         category_ids = request.data.get('category_ids', None)
         max_budget = request.data.get('max_budget', None)
         interests = request.data.get('interests', None)
+        # Ask for a fresh LLM reply even if the same request was answered recently
+        regenerate = bool(request.data.get('regenerate', False))
         
         try:
             generator = LLMRouteGenerator()
@@ -89,7 +92,7 @@ class RouteViewSet(viewsets.ModelViewSet):
                 'route_description': route_description,  # Pass route description to generator
                 'place_types': place_types  # Pass place types for combining
             }
-            llm_response = generator.generate_route(preferences, duration_hours)
+            llm_response = generator.generate_route(preferences, duration_hours, ignore_cache=regenerate)
             route = generator.create_route_from_llm_response(request.user, llm_response, duration_hours)
             
             serializer = RouteSerializer(route)
@@ -106,61 +109,39 @@ class RouteViewSet(viewsets.ModelViewSet):
         """Optimize route order using nearest neighbor algorithm."""
         route = self.get_object()
         
-        route_attractions = list(route.route_attractions.select_related('attraction').all())
+        # Ordering only needs coordinates, not the full attraction rows
+        route_attractions = list(
+            route.route_attractions.select_related('attraction').only(
+                'id', 'route_id', 'order', 'attraction__latitude', 'attraction__longitude'
+            )
+        )
         
         if len(route_attractions) <= 1:
             serializer = self.get_serializer(route)
             return Response(serializer.data)
         
-        # Calculate distance helper
-        def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            import math
-            R = 6371
-            dlat = math.radians(lat2 - lat1)
-            dlon = math.radians(lon2 - lon1)
-            a = (math.sin(dlat / 2) ** 2 +
-                 math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-                 math.sin(dlon / 2) ** 2)
-            c = 2 * math.asin(math.sqrt(a))
-            return R * c
-        
-        # Get coordinates
-        points = [
-            (float(ra.attraction.latitude), float(ra.attraction.longitude), ra)
-            for ra in route_attractions
-        ]
-        
-        # Reorder using nearest neighbor
-        ordered = [points[0]]
-        remaining = points[1:]
-        
-        while remaining:
-            current = ordered[-1]
-            nearest = min(
-                remaining,
-                key=lambda p: calculate_distance(
-                    current[0], current[1], p[0], p[1]
-                )
-            )
-            ordered.append(nearest)
-            remaining.remove(nearest)
-        
-        # Update order
-        for new_order, (_, _, route_attraction) in enumerate(ordered, 1):
-            route_attraction.order = new_order
-            route_attraction.save()
+        # Reorder using nearest neighbor over a precomputed distance matrix
+        lats = [float(ra.attraction.latitude) for ra in route_attractions]
+        lons = [float(ra.attraction.longitude) for ra in route_attractions]
+        order = nearest_neighbour_order(lats, lons)
         
         # Recalculate distance
-        total_distance = 0.0
-        for i in range(len(ordered) - 1):
-            distance = calculate_distance(
-                ordered[i][0], ordered[i][1],
-                ordered[i + 1][0], ordered[i + 1][1]
-            )
-            total_distance += distance
-        
-        route.distance_km = Decimal(str(total_distance))
-        route.save()
+        total_distance = path_distance([lats[i] for i in order], [lons[i] for i in order])
+        
+        # Stored orders are distinct and >= 1, so shifting them past the largest
+        # one frees 1..n for the new order
+        offset = max(ra.order for ra in route_attractions)
+        for new_order, index in enumerate(order, 1):
+            route_attractions[index].order = new_order
+        
+        with transaction.atomic():
+            # (route, order) is unique and checked row by row, so move the old
+            # orders out of the way before writing the new ones in one UPDATE
+            RouteAttraction.objects.filter(route=route).update(order=F('order') + offset)
+            RouteAttraction.objects.bulk_update(route_attractions, ['order'])
+            
+            route.distance_km = Decimal(str(total_distance))
+            route.save()
         
         serializer = self.get_serializer(route)
         return Response(serializer.data)
@@ -0,0 +1,122 @@
+"""
+Saving scraped attractions to the database.
+"""
+import logging
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from django.db import transaction
+from django.utils.text import slugify
+from attractions.models import Attraction, Category
+from attractions.signals import invalidate_attraction_cache
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500
+
+# Columns refreshed from scraped data with update_existing
+UPDATE_FIELDS = (
+    'description', 'short_description', 'latitude', 'longitude', 'address',
+    'rating', 'visit_duration', 'price', 'is_free',
+)
+
+
+def create_slug(name: str, taken_slugs: set) -> str:
+    """Create URL-friendly slug from name, unique among `taken_slugs`."""
+    slug = slugify(name)
+    # Ensure uniqueness by appending number if needed
+    base_slug = slug
+    counter = 1
+    while slug in taken_slugs:
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    taken_slugs.add(slug)
+    return slug
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_attractions(attractions_data: Iterable[Dict], update_existing: bool = False) -> Tuple[int, int]:
+    """Insert new and optionally update existing attractions; returns (created, updated) counts.
+
+    Rows are consumed lazily and written every IMPORT_BATCH_SIZE rows, so a
+    generator input is never held in memory as a whole.
+    """
+    # Get or create default category
+    default_category, _ = Category.objects.get_or_create(
+        name='Общее',
+        defaults={'slug': 'general', 'description': 'Общие достопримечательности'}
+    )
+    
+    taken_slugs = set(Attraction.objects.values_list('slug', flat=True))
+    attractions_by_name = {
+        attraction.name: attraction
+        for attraction in Attraction.objects.only('id', 'name', *UPDATE_FIELDS)
+    }
+    created_names = set()
+    updated_ids = set()
+    
+    for batch in batched(attractions_data, IMPORT_BATCH_SIZE):
+        to_create = []
+        to_update = {}
+        changed_fields = set()
+        
+        for att_data in batch:
+            name = att_data['name']
+            if name in created_names:
+                continue
+            attraction = attractions_by_name.get(name)
+            
+            if attraction is None:
+                # Parsers report a missing description as None
+                attraction = Attraction(
+                    name=name,
+                    slug=create_slug(name, taken_slugs),
+                    description=att_data.get('description') or '',
+                    short_description=att_data.get('short_description') or '',
+                    latitude=att_data.get('latitude', 55.8304),  # Default Kazan coordinates
+                    longitude=att_data.get('longitude', 49.0661),
+                    address=att_data.get('address', ''),
+                    category=default_category,
+                    rating=att_data.get('rating', 0.0),
+                    visit_duration=att_data.get('visit_duration', 60),
+                    price=att_data.get('price', 0.0),
+                    is_free=att_data.get('is_free', True),
+                    website=att_data.get('url', ''),
+                )
+                # bulk_create skips save(), which fills this in for other writes
+                attraction.fill_short_description()
+                to_create.append(attraction)
+                created_names.add(name)
+                logger.info(f'Created: {name}')
+            elif update_existing:
+                # Update existing attraction, writing only the columns that changed
+                changed = False
+                for key in UPDATE_FIELDS:
+                    value = att_data.get(key)
+                    if not value:
+                        continue
+                    value = Attraction._meta.get_field(key).to_python(value)
+                    if getattr(attraction, key) != value:
+                        setattr(attraction, key, value)
+                        changed_fields.add(key)
+                        changed = True
+                if changed:
+                    to_update[attraction.pk] = attraction
+                    updated_ids.add(attraction.pk)
+                    logger.info(f'Updated: {name}')
+        
+        with transaction.atomic():
+            Attraction.objects.bulk_create(to_create, batch_size=IMPORT_BATCH_SIZE, ignore_conflicts=True)
+            if to_update:
+                Attraction.objects.bulk_update(to_update.values(), sorted(changed_fields), batch_size=IMPORT_BATCH_SIZE)
+    
+    if created_names or updated_ids:
+        # Bulk queries skip post_save, so drop cached attraction data here
+        invalidate_attraction_cache(sender=Attraction)
+    
+    return len(created_names), len(updated_ids)
@@ -2,10 +2,12 @@
 Scraper module for collecting tourist attractions data in Kazan.
 """
 import re
-import time
+import asyncio
+import functools
 import logging
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+from typing import List, Dict, Optional, Tuple
+import aiohttp
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,21 +15,99 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from django.conf import settings
+from django.core.cache import cache
+from config.llm import parse_json_object
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+FETCH_TIMEOUT = 10  # seconds per page
+RENDER_TIMEOUT = 10  # seconds to wait for listings in Chrome
+PAGE_VALIDATORS_TIMEOUT = 60 * 60 * 24 * 7  # keep ETag/Last-Modified for a week
+ENRICH_CONCURRENCY = 10  # parallel Perplexity requests, kept under the API rate limit
+ENRICH_BATCH_SIZE = 10  # attractions described per Perplexity request
+
+# Resources rendered pages never need: media, fonts, styles and trackers
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.woff*', '*.css',
+    '*googletagmanager*', '*google-analytics*', '*doubleclick*', '*mc.yandex.ru*',
+]
+
+# Shape of the enrichment reply, enforced through response_format
+ENRICHMENT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'description': {'type': 'string'},
+        'short_description': {'type': 'string'},
+        'price': {'type': 'number'},
+        'is_free': {'type': 'boolean'},
+        'visit_duration': {'type': 'integer'},
+        'opening_hours': {'type': ['string', 'null']},
+        'highlights': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['description', 'price', 'is_free', 'visit_duration'],
+}
+
+BATCH_ENRICHMENT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'attractions': {
+            'type': 'array',
+            'items': {
+                **ENRICHMENT_SCHEMA,
+                'properties': {'name': {'type': 'string'}, **ENRICHMENT_SCHEMA['properties']},
+                'required': ['name', *ENRICHMENT_SCHEMA['required']],
+            },
+        },
+    },
+    'required': ['attractions'],
+}
+
+ATTRACTION_CARD_RE = re.compile(r'attraction|place|object')
+CARD_TITLE_RE = re.compile(r'title|name')
+CARD_TEXT_RE = re.compile(r'description|text')
+
+# Only the listing subtrees are parsed; the rest of the page is skipped
+TRIPADVISOR_STRAINER = SoupStrainer('div', class_='attraction_element')
+VISITKAZAN_STRAINER = SoupStrainer('div', class_=ATTRACTION_CARD_RE)
+
+# CSS equivalents of the above, used to tell when a rendered page is ready
+TRIPADVISOR_READY_SELECTOR = 'div.attraction_element'
+VISITKAZAN_READY_SELECTOR = "div[class*='attraction'], div[class*='place'], div[class*='object']"
+
+
+def save_page_validators(page_validators: Dict[str, Dict]):
+    """
+    Remember the ETag/Last-Modified of fetched pages for conditional GETs.
+    
+    Only call this once the pages' attractions have been saved, otherwise
+    an unchanged page would be skipped before it was ever imported.
+    """
+    for url, validators in page_validators.items():
+        if validators:
+            cache.set(f'scraper:validators:{url}', validators, PAGE_VALIDATORS_TIMEOUT)
+
+
+def normalize_name(name: str) -> str:
+    """Attraction name for matching LLM replies to scraped rows."""
+    return ' '.join(name.replace('"', ' ').replace('«', ' ').replace('»', ' ').split()).casefold()
+
 
 class KazanAttractionScraper:
     """Scraper for Kazan tourist attractions."""
     
-    def __init__(self, headless: bool = True):
-        """Initialize scraper with Selenium driver."""
+    def __init__(self, headless: bool = True, js_urls=()):
+        """Initialize scraper; Selenium is only started for `js_urls`."""
         self.headless = headless
         self.driver = None
         self.base_urls = [
             'https://www.tripadvisor.ru/Attractions-g298520-Activities-Kazan_Republic_of_Tatarstan.html',
             'https://www.visitkazan.ru/',
         ]
+        # Pages whose listings are rendered by JavaScript and need a browser
+        self.js_urls = set(js_urls)
+        # Validators of fetched pages, see save_page_validators
+        self.page_validators = {}
     
     def _init_driver(self):
         """Initialize Selenium WebDriver."""
@@ -37,11 +117,19 @@ class KazanAttractionScraper:
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        chrome_options.add_argument(f'user-agent={USER_AGENT}')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        # Only the DOM is parsed, so don't wait for images and other subresources
+        chrome_options.page_load_strategy = 'eager'
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.implicitly_wait(10)
+            # One keep-alive session is reused for every rendered URL; readiness
+            # is checked with explicit waits, so no implicit wait is set
+            self.driver = webdriver.Chrome(options=chrome_options, keep_alive=True)
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
         except Exception as e:
             logger.error(f"Failed to initialize Chrome driver: {e}")
             raise
@@ -52,242 +140,379 @@ class KazanAttractionScraper:
             self.driver.quit()
             self.driver = None
     
-    def scrape_tripadvisor(self, url: str) -> List[Dict]:
-        """Scrape attractions from TripAdvisor."""
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Download page HTML; None if the page hasn't changed since the last scrape."""
+        # Conditional GET with the validators the server sent last time
+        validators = cache.get(f'scraper:validators:{url}') or {}
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                logger.info(f"Page not modified since the last scrape: {url}")
+                return None
+            response.raise_for_status()
+            html = await response.text()
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        
+        if any(validators.values()):
+            self.page_validators[url] = validators
+        return html
+    
+    def _render_with_driver(self, url: str, ready_selector: str) -> str:
+        """Load a JavaScript-rendered page in Selenium and return its HTML."""
+        if not self.driver:
+            self._init_driver()
+        
+        self.driver.get(url)
+        
+        # Wait only until the listings the parser reads are in the DOM
+        WebDriverWait(self.driver, RENDER_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+        )
+        
+        return self.driver.page_source
+    
+    def parse_tripadvisor(self, html: str) -> List[Dict]:
+        """Parse attractions from a TripAdvisor listing page."""
         attractions = []
+        soup = BeautifulSoup(html, 'lxml', parse_only=TRIPADVISOR_STRAINER)
         
-        try:
-            if not self.driver:
-                self._init_driver()
-            
-            self.driver.get(url)
-            time.sleep(3)  # Wait for page load
-            
-            # Wait for attractions list to load
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "attraction_element"))
-            )
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Find all attraction elements
-            attraction_elements = soup.find_all('div', class_='attraction_element')
-            
-            for element in attraction_elements:
-                try:
-                    name_elem = element.find('div', class_='listing_title')
-                    if not name_elem:
-                        continue
-                    
-                    name = name_elem.get_text(strip=True)
-                    
-                    # Get rating
-                    rating_elem = element.find('span', class_='ui_bubble_rating')
-                    rating = 0.0
-                    if rating_elem:
-                        rating_class = rating_elem.get('class', [])
-                        for cls in rating_class:
-                            if 'bubble_' in cls:
-                                rating_str = cls.split('_')[-1]
-                                rating = float(rating_str) / 10.0
-                    
-                    # Get link
-                    link_elem = element.find('a', href=True)
-                    link = link_elem['href'] if link_elem else None
-                    if link and not link.startswith('http'):
-                        link = f"https://www.tripadvisor.ru{link}"
-                    
-                    # Get address (if available)
-                    address_elem = element.find('span', class_='format_address')
-                    address = address_elem.get_text(strip=True) if address_elem else None
-                    
-                    attractions.append({
-                        'name': name,
-                        'rating': rating,
-                        'url': link,
-                        'address': address,
-                        'source': 'tripadvisor'
-                    })
-                except Exception as e:
-                    logger.error(f"Error parsing attraction element: {e}")
-                    continue
+        # Find all attraction elements
+        attraction_elements = soup.find_all('div', class_='attraction_element')
         
-        except Exception as e:
-            logger.error(f"Error scraping TripAdvisor: {e}")
+        for element in attraction_elements:
+            try:
+                name_elem = element.find('div', class_='listing_title')
+                if not name_elem:
+                    continue
+                
+                name = name_elem.get_text(strip=True)
+                
+                # Get rating
+                rating_elem = element.find('span', class_='ui_bubble_rating')
+                rating = 0.0
+                if rating_elem:
+                    rating_class = rating_elem.get('class', [])
+                    for cls in rating_class:
+                        if 'bubble_' in cls:
+                            rating_str = cls.split('_')[-1]
+                            rating = float(rating_str) / 10.0
+                
+                # Get link
+                link_elem = element.find('a', href=True)
+                link = link_elem['href'] if link_elem else None
+                if link and not link.startswith('http'):
+                    link = f"https://www.tripadvisor.ru{link}"
+                
+                # Get address (if available)
+                address_elem = element.find('span', class_='format_address')
+                address = address_elem.get_text(strip=True) if address_elem else None
+                
+                attractions.append({
+                    'name': name,
+                    'rating': rating,
+                    'url': link,
+                    'address': address,
+                    'source': 'tripadvisor'
+                })
+            except Exception as e:
+                logger.error(f"Error parsing attraction element: {e}")
+                continue
         
         return attractions
     
-    def scrape_visitkazan(self, url: str) -> List[Dict]:
-        """Scrape attractions from visitkazan.ru."""
+    def parse_visitkazan(self, html: str) -> List[Dict]:
+        """Parse attractions from a visitkazan.ru page."""
         attractions = []
+        soup = BeautifulSoup(html, 'lxml', parse_only=VISITKAZAN_STRAINER)
         
-        try:
-            if not self.driver:
-                self._init_driver()
-            
-            self.driver.get(url)
-            time.sleep(3)
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Find attraction cards (adjust selectors based on actual site structure)
-            attraction_cards = soup.find_all('div', class_=re.compile(r'attraction|place|object'))
-            
-            for card in attraction_cards:
-                try:
-                    name_elem = card.find(['h2', 'h3', 'h4', 'a'], class_=re.compile(r'title|name'))
-                    if not name_elem:
-                        continue
-                    
-                    name = name_elem.get_text(strip=True)
-                    
-                    # Get description
-                    desc_elem = card.find('p', class_=re.compile(r'description|text'))
-                    description = desc_elem.get_text(strip=True) if desc_elem else None
-                    
-                    # Get link
-                    link_elem = card.find('a', href=True)
-                    link = link_elem['href'] if link_elem else None
-                    if link and not link.startswith('http'):
-                        link = f"https://www.visitkazan.ru{link}"
-                    
-                    attractions.append({
-                        'name': name,
-                        'description': description,
-                        'url': link,
-                        'source': 'visitkazan'
-                    })
-                except Exception as e:
-                    logger.error(f"Error parsing attraction card: {e}")
+        # Find attraction cards (adjust selectors based on actual site structure)
+        attraction_cards = soup.find_all('div', class_=ATTRACTION_CARD_RE)
+        
+        for card in attraction_cards:
+            try:
+                name_elem = card.find(['h2', 'h3', 'h4', 'a'], class_=CARD_TITLE_RE)
+                if not name_elem:
                     continue
+                
+                name = name_elem.get_text(strip=True)
+                
+                # Get description
+                desc_elem = card.find('p', class_=CARD_TEXT_RE)
+                description = desc_elem.get_text(strip=True) if desc_elem else None
+                
+                # Get link
+                link_elem = card.find('a', href=True)
+                link = link_elem['href'] if link_elem else None
+                if link and not link.startswith('http'):
+                    link = f"https://www.visitkazan.ru{link}"
+                
+                attractions.append({
+                    'name': name,
+                    'description': description,
+                    'url': link,
+                    'source': 'visitkazan'
+                })
+            except Exception as e:
+                logger.error(f"Error parsing attraction card: {e}")
+                continue
         
+        return attractions
+    
+    async def scrape_tripadvisor(self, session: aiohttp.ClientSession, url: str) -> Optional[List[Dict]]:
+        """Scrape attractions from TripAdvisor; None if the page needs a browser."""
+        try:
+            html = await self._fetch(session, url)
+        except Exception as e:
+            logger.error(f"Error scraping TripAdvisor: {e}")
+            return []
+        if html is None:
+            return []
+        return self.parse_tripadvisor(html) or None
+    
+    async def scrape_visitkazan(self, session: aiohttp.ClientSession, url: str) -> Optional[List[Dict]]:
+        """Scrape attractions from visitkazan.ru; None if the page needs a browser."""
+        try:
+            html = await self._fetch(session, url)
         except Exception as e:
             logger.error(f"Error scraping visitkazan.ru: {e}")
-        
-        return attractions
+            return []
+        if html is None:
+            return []
+        return self.parse_visitkazan(html) or None
     
-    def get_coordinates_from_address(self, address: str) -> Optional[Dict]:
-        """Get coordinates from address (placeholder - would use geocoding API)."""
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def get_coordinates_from_address(address: str) -> Optional[Dict]:
+        """Get coordinates from address (placeholder - would use geocoding API).
+
+        Memoized per process, since scraped sources repeat the same addresses.
+        """
         # In production, use geocoding API (Yandex Maps, Google Maps, etc.)
         # For now, return None
         return None
     
-    def scrape_all(self) -> List[Dict]:
-        """Scrape attractions from all sources."""
-        all_attractions = []
+    def _client_session(self) -> aiohttp.ClientSession:
+        """Keep-alive HTTP session for page fetches."""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=30),
+            headers={'User-Agent': USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT),
+        )
+    
+    def fetch_page(self, url: str) -> Optional[str]:
+        """Download one page synchronously; None if unchanged."""
+        async def fetch():
+            async with self._client_session() as session:
+                return await self._fetch(session, url)
+        return asyncio.run(fetch())
+    
+    def parse_page(self, url: str, html: str) -> List[Dict]:
+        """Parse a downloaded page with the parser for its source."""
+        if 'tripadvisor' in url:
+            return self.parse_tripadvisor(html)
+        if 'visitkazan' in url:
+            return self.parse_visitkazan(html)
+        return []
+    
+    async def _scrape_static(self, urls: List[str]) -> Tuple[List[Dict], List[str]]:
+        """
+        Fetch plain HTML pages concurrently over one keep-alive session.
         
-        try:
-            self._init_driver()
-            
-            # Scrape TripAdvisor
-            for url in self.base_urls:
+        Returns the attractions found and the URLs whose HTML came back
+        without any listings, which have to be rendered in a browser.
+        """
+        async with self._client_session() as session:
+            tasks = {}
+            for url in urls:
                 if 'tripadvisor' in url:
                     logger.info(f"Scraping TripAdvisor: {url}")
-                    attractions = self.scrape_tripadvisor(url)
-                    all_attractions.extend(attractions)
+                    tasks[url] = self.scrape_tripadvisor(session, url)
                 elif 'visitkazan' in url:
                     logger.info(f"Scraping VisitKazan: {url}")
-                    attractions = self.scrape_visitkazan(url)
-                    all_attractions.extend(attractions)
+                    tasks[url] = self.scrape_visitkazan(session, url)
+            results = await asyncio.gather(*tasks.values())
+        
+        all_attractions = []
+        unrendered_urls = []
+        for url, attractions in zip(tasks, results):
+            if attractions is None:
+                unrendered_urls.append(url)
+                # The static HTML says nothing about the rendered listings, so
+                # a 304 for it must not stop the page from being rendered again
+                self.page_validators.pop(url, None)
+            else:
+                all_attractions.extend(attractions)
+        return all_attractions, unrendered_urls
+    
+    def _scrape_rendered(self, urls: List[str]) -> List[Dict]:
+        """Scrape JavaScript-rendered pages one by one in Selenium."""
+        all_attractions = []
+        
+        try:
+            for url in urls:
+                try:
+                    if 'tripadvisor' in url:
+                        logger.info(f"Scraping TripAdvisor with browser: {url}")
+                        html = self._render_with_driver(url, TRIPADVISOR_READY_SELECTOR)
+                        all_attractions.extend(self.parse_tripadvisor(html))
+                    elif 'visitkazan' in url:
+                        logger.info(f"Scraping VisitKazan with browser: {url}")
+                        html = self._render_with_driver(url, VISITKAZAN_READY_SELECTOR)
+                        all_attractions.extend(self.parse_visitkazan(html))
+                except Exception as e:
+                    logger.error(f"Error scraping {url} with browser: {e}")
         
         finally:
             self._close_driver()
         
         return all_attractions
     
-    def enrich_with_perplexity(self, attraction_data: Dict) -> Dict:
-        """Enrich attraction data using Perplexity API."""
-        api_key = getattr(settings, 'PERPLEXITY_API_KEY', None)
-        if not api_key:
-            logger.warning("Perplexity API key not set. Skipping enrichment.")
-            return attraction_data
+    def render_page(self, url: str) -> List[Dict]:
+        """Render one page in Selenium and parse its attractions."""
+        return self._scrape_rendered([url])
+    
+    def scrape_all(self) -> List[Dict]:
+        """Scrape attractions from all sources."""
+        static_urls = [url for url in self.base_urls if url not in self.js_urls]
+        rendered_urls = [url for url in self.base_urls if url in self.js_urls]
         
-        try:
-            from perplexity import Perplexity
-            import json
+        all_attractions = []
+        if static_urls:
+            all_attractions, unrendered_urls = asyncio.run(self._scrape_static(static_urls))
+            # Listings missing from the plain HTML are filled in by JavaScript
+            rendered_urls.extend(unrendered_urls)
+        if rendered_urls:
+            all_attractions.extend(self._scrape_rendered(rendered_urls))
+        
+        return all_attractions
+    
+    def _apply_enrichment(self, attraction_data: Dict, perplexity_data: Dict) -> Dict:
+        """Merge one attraction's Perplexity data into the scraped data."""
+        attraction_name = attraction_data.get('name', '')
+        if perplexity_data:
+            # Merge Perplexity data with existing data (don't overwrite existing fields)
+            if perplexity_data.get('description') and not attraction_data.get('description'):
+                attraction_data['description'] = perplexity_data['description']
+            
+            if perplexity_data.get('short_description') and not attraction_data.get('short_description'):
+                attraction_data['short_description'] = perplexity_data['short_description']
+            
+            if perplexity_data.get('price') is not None:
+                attraction_data['price'] = perplexity_data.get('price', 0.0)
+                attraction_data['is_free'] = perplexity_data.get('is_free', True)
             
-            attraction_name = attraction_data.get('name', '')
-            if not attraction_name:
-                return attraction_data
+            if perplexity_data.get('visit_duration'):
+                attraction_data['visit_duration'] = perplexity_data['visit_duration']
             
-            # Build prompt for Perplexity
-            prompt = f"""Предоставь актуальную информацию о достопримечательности "{attraction_name}" в Казани.
+            if perplexity_data.get('opening_hours'):
+                attraction_data['opening_hours'] = perplexity_data['opening_hours']
+            
+            if perplexity_data.get('highlights'):
+                attraction_data['highlights'] = perplexity_data['highlights']
+            
+            logger.info(f"Successfully enriched attraction '{attraction_name}' with Perplexity data")
+        
+        return attraction_data
+    
+    def _batch_enrichment_request(self, attraction_names: List[str]) -> Dict:
+        """Chat completion arguments asking Perplexity about several attractions at once."""
+        names = "\n".join(f'{i}. "{name}"' for i, name in enumerate(attraction_names, 1))
+        prompt = f"""Предоставь актуальную информацию о каждой из этих достопримечательностей Казани:
+{names}
 
-Нужна следующая информация:
+Для каждой нужна следующая информация:
 1. Подробное описание (2-3 предложения)
 2. Примерная стоимость посещения (если платно) или указание что бесплатно
 3. Рекомендуемое время посещения в минутах
 4. Актуальная информация о режиме работы (если доступна)
 5. Особенности и интересные факты
 
-Верни ответ в формате JSON:
+Верни ответ в формате JSON, по одному объекту на каждое место, "name" - точное название из списка:
 {{
-    "description": "Подробное описание",
-    "short_description": "Краткое описание (до 200 символов)",
-    "price": 0.0,
-    "is_free": true,
-    "visit_duration": 60,
-    "opening_hours": "Режим работы или null",
-    "highlights": ["Особенность 1", "Особенность 2"]
+    "attractions": [
+        {{
+            "name": "Название из списка",
+            "description": "Подробное описание",
+            "short_description": "Краткое описание (до 200 символов)",
+            "price": 0.0,
+            "is_free": true,
+            "visit_duration": 60,
+            "opening_hours": "Режим работы или null",
+            "highlights": ["Особенность 1", "Особенность 2"]
+        }}
+    ]
 }}"""
-            
-            model = getattr(settings, 'PERPLEXITY_MODEL', 'sonar-pro')
-            
-            # Use official Perplexity Python SDK
-            user_message = f"""Ты помощник по туристическим достопримечательностям Казани. Отвечай только валидным JSON без дополнительных комментариев.
+        
+        user_message = f"""Ты помощник по туристическим достопримечательностям Казани. Отвечай только валидным JSON без дополнительных комментариев.
 
 {prompt}"""
-            
-            client = Perplexity(api_key=api_key)
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            content = response.choices[0].message.content
-            
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                perplexity_data = json.loads(json_match.group())
-                
-                # Merge Perplexity data with existing data (don't overwrite existing fields)
-                if perplexity_data.get('description') and not attraction_data.get('description'):
-                    attraction_data['description'] = perplexity_data['description']
-                
-                if perplexity_data.get('short_description') and not attraction_data.get('short_description'):
-                    attraction_data['short_description'] = perplexity_data['short_description']
-                
-                if perplexity_data.get('price') is not None:
-                    attraction_data['price'] = perplexity_data.get('price', 0.0)
-                    attraction_data['is_free'] = perplexity_data.get('is_free', True)
-                
-                if perplexity_data.get('visit_duration'):
-                    attraction_data['visit_duration'] = perplexity_data['visit_duration']
-                
-                if perplexity_data.get('opening_hours'):
-                    attraction_data['opening_hours'] = perplexity_data['opening_hours']
-                
-                if perplexity_data.get('highlights'):
-                    attraction_data['highlights'] = perplexity_data['highlights']
-                
-                logger.info(f"Successfully enriched attraction '{attraction_name}' with Perplexity data")
-            else:
-                logger.warning(f"Could not parse JSON from Perplexity response for '{attraction_name}'")
+        
+        return {
+            'model': getattr(settings, 'PERPLEXITY_MODEL', 'sonar-pro'),
+            'messages': [
+                {"role": "user", "content": user_message}
+            ],
+            'temperature': 0.3,
+            'max_tokens': 400 * len(attraction_names),
+            'response_format': {
+                'type': 'json_schema',
+                'json_schema': {'schema': BATCH_ENRICHMENT_SCHEMA},
+            },
+        }
+    
+    async def _enrich_batch_async(self, client, semaphore: asyncio.Semaphore, batch: List[Dict]) -> List[Dict]:
+        """Enrich a batch of attractions with a single Perplexity request."""
+        named = [attraction_data for attraction_data in batch if attraction_data.get('name')]
+        if not named:
+            return batch
+        
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    **self._batch_enrichment_request([attraction_data['name'] for attraction_data in named])
+                )
+            reply = parse_json_object(response.choices[0].message.content) or {}
+            by_name = {
+                normalize_name(item['name']): item
+                for item in reply.get('attractions', [])
+                if isinstance(item, dict) and item.get('name')
+            }
+            for attraction_data in named:
+                perplexity_data = by_name.get(normalize_name(attraction_data['name']))
+                if perplexity_data is None:
+                    logger.warning(f"No Perplexity data returned for '{attraction_data['name']}'")
+                    continue
+                self._apply_enrichment(attraction_data, perplexity_data)
         
         except Exception as e:
-            logger.error(f"Error enriching attraction '{attraction_data.get('name', 'unknown')}' with Perplexity: {e}")
+            logger.error(f"Error enriching {len(named)} attractions with Perplexity: {e}")
             # Continue with existing data if enrichment fails
         
-        return attraction_data
+        return batch
     
-    def enrich_attraction_data(self, attraction_data: Dict) -> Dict:
-        """Enrich attraction data with additional information."""
+    async def _enrich_all(self, items: List[Dict], api_key: str) -> List[Dict]:
+        """Enrich all attractions ENRICH_BATCH_SIZE per request, at most ENRICH_CONCURRENCY requests at a time."""
+        from perplexity import AsyncPerplexity
+        
+        semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+        batches = [items[i:i + ENRICH_BATCH_SIZE] for i in range(0, len(items), ENRICH_BATCH_SIZE)]
+        async with AsyncPerplexity(api_key=api_key) as client:
+            await asyncio.gather(*(
+                self._enrich_batch_async(client, semaphore, batch)
+                for batch in batches
+            ))
+        return items
+    
+    def _apply_defaults(self, attraction_data: Dict) -> Dict:
+        """Fill in coordinates and default values for scraped data."""
         # Get coordinates if address is available
         if attraction_data.get('address'):
             coords = self.get_coordinates_from_address(attraction_data['address'])
@@ -301,8 +526,21 @@ class KazanAttractionScraper:
         attraction_data.setdefault('price', 0.0)
         attraction_data.setdefault('is_free', True)
         
-        # Enrich with Perplexity API (hybrid approach)
-        attraction_data = self.enrich_with_perplexity(attraction_data)
-        
         return attraction_data
-
+    
+    def enrich_attraction_data(self, attraction_data: Dict) -> Dict:
+        """Enrich attraction data with additional information."""
+        return self.enrich_attraction_data_bulk([attraction_data])[0]
+    
+    def enrich_attraction_data_bulk(self, items: List[Dict]) -> List[Dict]:
+        """Enrich many attractions with batched, concurrent Perplexity requests."""
+        items = [self._apply_defaults(attraction_data) for attraction_data in items]
+        
+        api_key = getattr(settings, 'PERPLEXITY_API_KEY', None)
+        if not api_key:
+            logger.warning("Perplexity API key not set. Skipping enrichment.")
+            return items
+        if not items:
+            return items
+        
+        return asyncio.run(self._enrich_all(items, api_key))
@@ -1,21 +1,83 @@
 """
 Celery tasks for scraping attractions.
+
+A scrape runs as a chord: every source URL goes through its own
+fetch -> parse -> render -> enrich chain, so pages are spread across
+workers, and the results are written to the database in one final step.
+Pages travel between the steps as dicts with the URL, the page's HTTP
+validators and, once parsed, its attractions.
 """
-from celery import shared_task
-from django.core.management import call_command
+from celery import chord, shared_task
+from django.conf import settings
+from .importer import import_attractions
+from .scraper import KazanAttractionScraper, save_page_validators
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
-def scrape_attractions_task():
-    """Periodic task to scrape attractions."""
-    logger.info('Starting periodic attraction scraping...')
+def fetch_page_task(url):
+    """Download one source page; empty HTML if it is unchanged or can't be fetched."""
+    scraper = KazanAttractionScraper()
     try:
-        call_command('scrape_attractions', headless=True)
-        logger.info('Attraction scraping completed successfully')
+        html = scraper.fetch_page(url) or ''
     except Exception as e:
-        logger.error(f'Error during attraction scraping: {e}')
-        raise
+        # A failed header task would abort the whole chord
+        logger.error(f'Error fetching {url}: {e}')
+        html = ''
+    return {'url': url, 'html': html, 'validators': scraper.page_validators.get(url)}
+
+
+@shared_task
+def parse_page_task(page):
+    """Parse attractions from a downloaded page."""
+    attractions = KazanAttractionScraper().parse_page(page['url'], page['html']) if page['html'] else []
+    # Downloaded HTML without listings is filled in by JavaScript
+    needs_render = bool(page['html']) and not attractions
+    return {
+        'url': page['url'],
+        'attractions': attractions,
+        'needs_render': needs_render,
+        # The static HTML says nothing about the rendered listings
+        'validators': None if needs_render else page['validators'],
+    }
+
+
+@shared_task
+def render_page_task(page):
+    """Render a page in Chrome when its HTML had no listings."""
+    if page['needs_render']:
+        page['attractions'] = KazanAttractionScraper().render_page(page['url'])
+    return page
+
 
+@shared_task
+def enrich_page_task(page):
+    """Enrich a page's attractions with Perplexity."""
+    page['attractions'] = KazanAttractionScraper().enrich_attraction_data_bulk(page['attractions'])
+    return page
+
+
+@shared_task
+def persist_attractions_task(pages, update_existing=False):
+    """Save the attractions collected from all pages."""
+    attractions_data = (attraction for page in pages for attraction in page['attractions'])
+    created, updated = import_attractions(attractions_data, update_existing=update_existing)
+    # Unchanged pages are skipped next time only once they have been imported
+    save_page_validators({page['url']: page['validators'] for page in pages})
+    logger.info(f'Attraction scraping completed. Created: {created}, Updated: {updated}')
+
+
+@shared_task
+def scrape_attractions_task(update_existing=False):
+    """Periodic task to scrape attractions."""
+    logger.info('Starting periodic attraction scraping...')
+    pipelines = [
+        fetch_page_task.s(url)
+        | parse_page_task.s()
+        | render_page_task.s().set(queue=settings.SCRAPER_BROWSER_QUEUE)
+        | enrich_page_task.s()
+        for url in KazanAttractionScraper().base_urls
+    ]
+    return chord(pipelines)(persist_attractions_task.s(update_existing=update_existing))
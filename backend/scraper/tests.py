@@ -1,12 +1,22 @@
-from django.test import TestCase
-from unittest.mock import Mock, patch, MagicMock
-from scraper.scraper import KazanAttractionScraper
+import asyncio
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
+from attractions.models import Attraction
+from scraper.importer import import_attractions
+from scraper.scraper import BLOCKED_URL_PATTERNS, KazanAttractionScraper, save_page_validators
+from scraper.tasks import (
+    enrich_page_task, fetch_page_task, parse_page_task, persist_attractions_task, render_page_task,
+)
 
 
 class ScraperTest(TestCase):
     """Tests for KazanAttractionScraper."""
 
     def setUp(self):
+        cache.clear()
         self.scraper = KazanAttractionScraper(headless=True)
 
     def test_scraper_initialization(self):
@@ -24,6 +34,134 @@ class ScraperTest(TestCase):
         
         self.assertIsNotNone(self.scraper.driver)
         mock_chrome.assert_called_once()
+        mock_driver.execute_cdp_cmd.assert_any_call(
+            'Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS}
+        )
+
+    def test_scrape_all_without_browser(self):
+        """Test static pages are fetched over HTTP without starting Chrome."""
+        pages = {
+            self.scraper.base_urls[0]: (
+                '<div class="attraction_element"><div class="listing_title">'
+                '<a href="/Attraction-kremlin">Казанский Кремль</a></div></div>'
+            ),
+            self.scraper.base_urls[1]: (
+                '<div class="place-card"><h3 class="title">Улица Баумана</h3>'
+                '<p class="description">Пешеходная улица</p></div>'
+            ),
+        }
+        fetch = AsyncMock(side_effect=lambda session, url: pages[url])
+        with patch.object(KazanAttractionScraper, '_fetch', fetch), \
+                patch('scraper.scraper.webdriver.Chrome') as mock_chrome:
+            attractions = self.scraper.scrape_all()
+
+        mock_chrome.assert_not_called()
+        self.assertEqual(fetch.await_count, 2)
+        self.assertEqual(
+            [(a['name'], a['source']) for a in attractions],
+            [('Казанский Кремль', 'tripadvisor'), ('Улица Баумана', 'visitkazan')]
+        )
+        self.assertEqual(attractions[0]['url'], 'https://www.tripadvisor.ru/Attraction-kremlin')
+
+    def test_scrape_all_renders_pages_without_listings(self):
+        """Test Chrome is only used for pages whose HTML has no listings."""
+        pages = {
+            self.scraper.base_urls[0]: '<div id="app"></div>',
+            self.scraper.base_urls[1]: (
+                '<div class="place-card"><h3 class="title">Улица Баумана</h3></div>'
+            ),
+        }
+        rendered = (
+            '<div class="attraction_element"><div class="listing_title">'
+            '<a href="/Attraction-kremlin">Казанский Кремль</a></div></div>'
+        )
+        fetch = AsyncMock(side_effect=lambda session, url: pages[url])
+        with patch.object(KazanAttractionScraper, '_fetch', fetch), \
+                patch.object(KazanAttractionScraper, '_render_with_driver', return_value=rendered) as render:
+            attractions = self.scraper.scrape_all()
+
+        render.assert_called_once()
+        self.assertEqual(render.call_args.args[0], self.scraper.base_urls[0])
+        self.assertEqual(
+            sorted(a['name'] for a in attractions),
+            ['Казанский Кремль', 'Улица Баумана']
+        )
+
+    @override_settings(PERPLEXITY_API_KEY='test-key')
+    @patch('perplexity.AsyncPerplexity')
+    def test_enrich_attraction_data_bulk(self, mock_async_perplexity):
+        """Test bulk enrichment describes a batch of attractions in one request."""
+        reply = Mock()
+        reply.choices = [Mock(message=Mock(content=(
+            '{"attractions": ['
+            '{"name": "Улица Баумана", "description": "Описание", "visit_duration": 90}, '
+            '{"name": "«Казанский Кремль»", "description": "Крепость", "visit_duration": 120}]}'
+        )))]
+        client = mock_async_perplexity.return_value.__aenter__.return_value
+        client.chat.completions.create = AsyncMock(return_value=reply)
+
+        enriched = self.scraper.enrich_attraction_data_bulk([
+            {'name': 'Казанский Кремль'},
+            {'name': 'Улица Баумана', 'description': 'Пешеходная улица'},
+            {'name': 'Театр Камала'},
+        ])
+
+        mock_async_perplexity.assert_called_once_with(api_key='test-key')
+        self.assertEqual(client.chat.completions.create.await_count, 1)
+        self.assertEqual(enriched[0]['description'], 'Крепость')
+        self.assertEqual(enriched[1]['description'], 'Пешеходная улица')
+        self.assertEqual(enriched[1]['visit_duration'], 90)
+        self.assertEqual(enriched[2]['visit_duration'], 60)
+
+    def test_fetch_conditional_get(self):
+        """Test a page is re-requested with its ETag and skipped when unchanged."""
+        url = 'https://www.visitkazan.ru/'
+        session = MagicMock()
+        response = session.get.return_value.__aenter__.return_value
+        response.status = 200
+        response.headers = {'ETag': '"v1"'}
+        response.text = AsyncMock(return_value='<html></html>')
+        self.assertEqual(asyncio.run(self.scraper._fetch(session, url)), '<html></html>')
+        session.get.assert_called_with(url, headers={})
+
+        save_page_validators(self.scraper.page_validators)
+        response.status = 304
+        self.assertIsNone(asyncio.run(self.scraper._fetch(session, url)))
+        session.get.assert_called_with(url, headers={'If-None-Match': '"v1"'})
+
+    def test_rendered_page_validators_not_saved(self):
+        """Test a page that needed the browser is rendered again on the next scrape."""
+        url = self.scraper.base_urls[0]
+        scraper = KazanAttractionScraper()
+        scraper.base_urls = [url]
+        session = MagicMock()
+        response = session.get.return_value.__aenter__.return_value
+        response.headers = {'ETag': '"v1"'}
+        response.text = AsyncMock(return_value='<div id="app"></div>')
+        response.raise_for_status = Mock()
+
+        def get(page_url, headers):
+            # The server answers 304 to any conditional GET for the page
+            response.status = 304 if headers else 200
+            return session.get.return_value
+
+        session.get.side_effect = get
+        session.__aenter__.return_value = session
+        with patch.object(KazanAttractionScraper, '_client_session', return_value=session), \
+                patch.object(KazanAttractionScraper, '_render_with_driver', return_value='') as render:
+            for _ in range(2):
+                scraper.scrape_all()
+                save_page_validators(scraper.page_validators)
+
+        self.assertEqual(render.call_count, 2)
+        self.assertIsNone(cache.get(f'scraper:validators:{url}'))
+
+    def test_coordinates_memoized(self):
+        """Test repeated addresses are geocoded once."""
+        KazanAttractionScraper.get_coordinates_from_address.cache_clear()
+        self.scraper.get_coordinates_from_address('Кремль, Казань')
+        self.scraper.get_coordinates_from_address('Кремль, Казань')
+        self.assertEqual(KazanAttractionScraper.get_coordinates_from_address.cache_info().hits, 1)
 
     def test_calculate_distance(self):
         """Test distance calculation."""
@@ -52,3 +190,108 @@ class ScraperTest(TestCase):
         self.assertIn('price', enriched)
         self.assertIn('is_free', enriched)
 
+
+class ScrapeAttractionsCommandTest(TestCase):
+    """Tests for the scrape_attractions management command."""
+
+    def setUp(self):
+        self.kremlin = Attraction.objects.create(
+            name='Казанский Кремль',
+            slug='kazan-kremlin',
+            description='Историческая крепость',
+            latitude=55.8304,
+            longitude=49.0661,
+        )
+        self.scraped = [
+            {'name': 'Казанский Кремль', 'address': 'Кремль', 'rating': 4.8, 'source': 'tripadvisor'},
+            {'name': 'Kul Sharif', 'description': 'Мечеть', 'source': 'visitkazan'},
+            {'name': 'Kul Sharif', 'source': 'tripadvisor'},
+        ]
+
+    def _call(self, **options):
+        with patch.object(KazanAttractionScraper, 'scrape_all', return_value=self.scraped), \
+                override_settings(PERPLEXITY_API_KEY=''):
+            call_command('scrape_attractions', stdout=StringIO(), **options)
+
+    def test_creates_new_attractions(self):
+        """Test new names are inserted once and existing ones left alone."""
+        self._call()
+        self.assertEqual(Attraction.objects.count(), 2)
+        created = Attraction.objects.get(name='Kul Sharif')
+        self.assertEqual(created.slug, 'kul-sharif')
+        self.assertEqual(created.category.slug, 'general')
+        self.kremlin.refresh_from_db()
+        self.assertIsNone(self.kremlin.address)
+
+    def test_update_existing(self):
+        """Test --update-existing refreshes matched attractions in bulk."""
+        self._call(update_existing=True)
+        self.kremlin.refresh_from_db()
+        self.assertEqual(self.kremlin.address, 'Кремль')
+        self.assertEqual(float(self.kremlin.rating), 4.8)
+
+    def test_update_existing_skips_unchanged(self):
+        """Test rows whose scraped values match the database aren't rewritten."""
+        import_attractions(self.scraped, update_existing=True)
+        created, updated = import_attractions(self.scraped, update_existing=True)
+        self.assertEqual((created, updated), (0, 0))
+
+
+@override_settings(PERPLEXITY_API_KEY='')
+class ScrapeTasksTest(TestCase):
+    """Tests for the scraping task pipeline."""
+
+    def setUp(self):
+        cache.clear()
+
+    def run_pipeline(self, url):
+        """Run one page through the chain the way the chord does."""
+        return enrich_page_task(render_page_task(parse_page_task(fetch_page_task(url))))
+
+    def test_pipeline_persists_pages(self):
+        """Test each stage hands its result to the next and the last one saves."""
+        url = 'https://www.visitkazan.ru/'
+        html = '<div class="place-card"><h3 class="title">Улица Баумана</h3></div>'
+        with patch.object(KazanAttractionScraper, 'fetch_page', return_value=html), \
+                patch.object(KazanAttractionScraper, 'render_page') as render:
+            page = self.run_pipeline(url)
+        persist_attractions_task([page])
+        render.assert_not_called()
+        self.assertTrue(Attraction.objects.filter(name='Улица Баумана').exists())
+
+    def test_pipeline_renders_pages_without_listings(self):
+        """Test a page whose HTML has no listings is rendered and its validators aren't saved."""
+        url = 'https://www.tripadvisor.ru/Attractions-g298520-Activities-Kazan_Republic_of_Tatarstan.html'
+
+        def fetch_page(scraper, page_url):
+            scraper.page_validators[page_url] = {'etag': '"v1"', 'last_modified': None}
+            return '<div id="app"></div>'
+
+        with patch.object(KazanAttractionScraper, 'fetch_page', autospec=True, side_effect=fetch_page), \
+                patch.object(KazanAttractionScraper, 'render_page', return_value=[{'name': 'Казанский Кремль'}]):
+            page = self.run_pipeline(url)
+        persist_attractions_task([page])
+        self.assertTrue(Attraction.objects.filter(name='Казанский Кремль').exists())
+        self.assertIsNone(cache.get(f'scraper:validators:{url}'))
+
+    def test_validators_saved_after_persist(self):
+        """Test a page's validators are cached only by the final step."""
+        url = 'https://www.visitkazan.ru/'
+
+        def fetch_page(scraper, page_url):
+            scraper.page_validators[page_url] = {'etag': '"v1"', 'last_modified': None}
+            return '<div class="place-card"><h3 class="title">Улица Баумана</h3></div>'
+
+        with patch.object(KazanAttractionScraper, 'fetch_page', autospec=True, side_effect=fetch_page):
+            page = self.run_pipeline(url)
+        self.assertIsNone(cache.get(f'scraper:validators:{url}'))
+        persist_attractions_task([page])
+        self.assertEqual(cache.get(f'scraper:validators:{url}'), {'etag': '"v1"', 'last_modified': None})
+
+    def test_failed_fetch_yields_empty_page(self):
+        """Test a page that can't be fetched doesn't break the pipeline."""
+        with patch.object(KazanAttractionScraper, 'fetch_page', side_effect=OSError('timeout')), \
+                patch.object(KazanAttractionScraper, 'render_page') as render:
+            page = self.run_pipeline('https://www.visitkazan.ru/')
+        render.assert_not_called()
+        self.assertEqual(page['attractions'], [])